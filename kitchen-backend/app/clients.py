@@ -0,0 +1,68 @@
+import logging
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Clients:
+    http: httpx.AsyncClient | None = None
+    openai: AsyncOpenAI | None = None
+
+
+clients = Clients()
+
+
+async def open_clients():
+    """Create the shared, pooled outbound clients. Called once at startup."""
+    settings = get_settings()
+
+    clients.http = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+        ),
+        timeout=httpx.Timeout(settings.http_timeout_seconds),
+    )
+
+    # OpenAI gets its own pool so slow completions can't starve other outbound calls
+    clients.openai = AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        timeout=settings.openai_timeout_seconds,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_connections,
+            ),
+            timeout=httpx.Timeout(settings.openai_timeout_seconds),
+        ),
+    )
+    logger.info("Opened shared HTTP clients")
+
+
+async def close_clients():
+    """Close the shared clients and their connection pools."""
+    if clients.openai:
+        await clients.openai.close()
+        clients.openai = None
+    if clients.http:
+        await clients.http.aclose()
+        clients.http = None
+    logger.info("Closed shared HTTP clients")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Dependency to get the shared HTTP client."""
+    if clients.http is None:
+        raise RuntimeError("HTTP clients not initialized")
+    return clients.http
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Dependency to get the shared OpenAI client."""
+    if clients.openai is None:
+        raise RuntimeError("HTTP clients not initialized")
+    return clients.openai
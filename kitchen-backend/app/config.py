@@ -6,6 +6,7 @@ class Settings(BaseSettings):
     # Server settings
     port: int = 3000
     environment: str = "development"
+    metrics_token: str | None = None  # Bearer token for /metrics; unset disables it
 
     # MongoDB settings
     mongodb_uri: str
@@ -15,20 +16,83 @@ class Settings(BaseSettings):
     # OpenAI settings
     openai_api_key: str
     openai_model: str = "gpt-4o-mini"
+    openai_timeout_seconds: float = 60.0
+    openai_max_connections: int = 10
+    vision_image_detail: str = "high"  # "low", "high" or "auto"
+    vision_max_long_edge: int = 2048  # Images are shrunk to this before upload
+
+    # Shared outbound HTTP client settings
+    http_timeout_seconds: float = 10.0
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
 
     # JWT Authentication settings
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 60 * 24 * 365  # 1 year
+    jwt_cache_max_entries: int = 10000  # Verified tokens kept to skip re-decoding
+
+    # Password hashing settings
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 1
+    password_hash_queue_size: int = 16  # Requests waiting beyond this get a 503
 
     # Google OAuth settings
     google_client_id: str | None = None
 
+    # Image storage settings
+    storage_backend: str = "gcs"  # "gcs" or "local"
+    local_storage_dir: str = "media"  # Used when storage_backend is "local"
+    local_storage_url: str = "/media"
+    max_concurrent_uploads: int = 2
+    max_upload_bytes: int = 15_000_000  # Multipart image uploads, checked while reading
+    max_upload_pixels: int = 40_000_000
+    image_variant_widths: list[int] = [320, 640, 1200]
+    image_variant_formats: list[str] = ["webp"]  # Any of "webp", "avif", "jpeg"
+    image_process_workers: int = 1  # Processes for Pillow decode/resize/encode
+    storage_io_workers: int = 4  # Threads for blocking storage calls
+    direct_upload_expire_seconds: int = 900  # Lifetime of signed upload URLs
+    direct_upload_max_bytes: int = 20_000_000
+    image_background_processing: bool = False  # Finalize returns before resizing
+    image_worker_concurrency: int = 1
+    upload_sweep_interval_seconds: int = 3600  # How often never-finalized uploads are deleted
+
     # Google Cloud Storage settings
     gcs_bucket_name: str | None = None
     gcs_credentials_file: str | None = None  # Path to JSON file (local dev)
     gcs_credentials_json: str | None = None  # JSON string (production)
 
+    # Prompt cache settings
+    prompt_cache_ttl_seconds: int = 60 * 60 * 24 * 7  # 1 week
+    prompt_cache_max_entries: int = 1000
+    prompt_cache_persistent: bool = True  # Also keep entries in MongoDB
+
+    # Image extraction cache settings
+    image_cache_max_distance: int = 3  # Max Hamming distance between 64-bit hashes
+    image_cache_ttl_seconds: int = 60 * 60 * 24 * 30  # 30 days
+
+    # Generation job settings
+    generation_job_backend: str = "mongo"  # "mongo" or "memory" (single process, for tests)
+    generation_concurrency: int = 4  # OpenAI calls in flight per process
+    generation_requests_per_minute: float = 60.0
+    generation_burst: int = 5  # Requests allowed back to back before the rate applies
+    generation_max_attempts: int = 5
+    generation_retry_base_seconds: float = 2.0  # Doubles after every failed attempt
+    generation_retry_max_seconds: float = 60.0
+    generation_max_pending_jobs: int = 500  # Submissions beyond this get a 503
+    generation_job_lease_seconds: int = 300  # A running job is retried if not done by then
+    generation_job_retention_seconds: int = 60 * 60 * 24  # Finished jobs kept for polling
+    generation_job_poll_seconds: float = 1.0
+
+    # Recipe cache settings
+    # "memory" (per process) or "mongo" (shared, so every process sees invalidations)
+    recipe_cache_backend: str = "memory"
+    recipe_cache_ttl_seconds: int = 300
+    recipe_cache_max_entries: int = 1000
+
+    # Bulk import settings
+    import_max_bytes: int = 100_000_000  # NDJSON body size, checked while reading
+
     # CORS settings
     cors_origins: list[str] = ["http://localhost:5173"]
 
@@ -1,5 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config import get_settings
+from app.indexes import ensure_indexes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,8 @@ async def connect_to_mongo():
     await database.client.admin.command("ping")
     logger.info("Connected to MongoDB")
 
+    await ensure_indexes(database.db)
+
 
 async def close_mongo_connection():
     """Close MongoDB connection."""
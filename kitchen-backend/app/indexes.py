@@ -0,0 +1,294 @@
+"""Declarative registry of the MongoDB indexes the services rely on.
+
+`ensure_indexes` is called from `connect_to_mongo` at startup. Run this module
+directly to apply the indexes or to check which index each query actually uses:
+
+    python -m app.indexes --report
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class IndexQuery(BaseModel):
+    """A query shape an index is meant to serve, used by the explain() report."""
+
+    description: str
+    filter: dict
+    sort: list[tuple[str, int | dict]] | None = None
+    limit: int = 0
+
+
+class IndexSpec(BaseModel):
+    """An index to create on a collection and the queries it serves."""
+
+    collection: str
+    name: str
+    keys: list[tuple[str, int | str]]
+    options: dict = Field(default_factory=dict)
+    serves: list[IndexQuery] = Field(default_factory=list)
+
+    def to_index_model(self) -> IndexModel:
+        return IndexModel(self.keys, name=self.name, **self.options)
+
+
+INDEXES: list[IndexSpec] = [
+    IndexSpec(
+        collection="users",
+        name="email_unique",
+        keys=[("email", ASCENDING)],
+        options={"unique": True},
+        serves=[
+            IndexQuery(
+                description="AuthService.find_by_email",
+                filter={"email": "someone@example.com"},
+                limit=1,
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="users",
+        name="google_id_unique",
+        keys=[("google_id", ASCENDING)],
+        # Password-only users store google_id as null, so a sparse index would
+        # still see duplicates. Only index users that actually have a Google ID.
+        options={
+            "unique": True,
+            "partialFilterExpression": {"google_id": {"$type": "string"}},
+        },
+        serves=[
+            IndexQuery(
+                description="AuthService.find_by_google_id",
+                filter={"google_id": {"$eq": "1234567890", "$type": "string"}},
+                limit=1,
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="recipes",
+        name="user_id_id",
+        keys=[("user_id", ASCENDING), ("_id", ASCENDING)],
+        serves=[
+            IndexQuery(
+                description="RecipeService.get_by_user (first page)",
+                filter={"user_id": "000000000000000000000000"},
+                sort=[("_id", ASCENDING)],
+                limit=51,
+            ),
+            IndexQuery(
+                description="RecipeService.get_by_user (with cursor)",
+                filter={
+                    "user_id": "000000000000000000000000",
+                    "_id": {"$gt": ObjectId("000000000000000000000000")},
+                },
+                sort=[("_id", ASCENDING)],
+                limit=51,
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="recipes",
+        name="public_id",
+        keys=[("is_public", ASCENDING), ("_id", ASCENDING)],
+        options={"partialFilterExpression": {"is_public": True}},
+        serves=[
+            IndexQuery(
+                description="RecipeService.get_public (first page)",
+                filter={"is_public": True},
+                sort=[("_id", ASCENDING)],
+                limit=51,
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="recipes",
+        name="recipe_text",
+        keys=[("title", TEXT), ("description", TEXT), ("ingredients", TEXT)],
+        # A collection has at most one text index. A match in the title counts
+        # for more than one in the ingredients, which beats the description.
+        options={
+            "weights": {"title": 10, "ingredients": 4, "description": 2},
+            "default_language": "english",
+        },
+        serves=[
+            IndexQuery(
+                description="RecipeService.search (signed in)",
+                filter={
+                    "$text": {"$search": "tomato soup"},
+                    "$or": [{"is_public": True}, {"user_id": "000000000000000000000000"}],
+                },
+                sort=[("score", {"$meta": "textScore"}), ("_id", ASCENDING)],
+                limit=51,
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="recipes",
+        name="ingredient_tokens",
+        keys=[("ingredient_tokens", ASCENDING)],
+        serves=[
+            IndexQuery(
+                description="RecipeService.pantry_matches (first $match)",
+                filter={
+                    "ingredient_tokens": {"$in": ["tomato", "onion", "garlic"]},
+                    "is_public": True,
+                },
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="prompt_cache",
+        name="expires_at_ttl",
+        keys=[("expires_at", ASCENDING)],
+        # Removes each entry once its expires_at has passed
+        options={"expireAfterSeconds": 0},
+    ),
+    IndexSpec(
+        collection="recipe_cache",
+        name="expires_at_ttl",
+        keys=[("expires_at", ASCENDING)],
+        # Only used with recipe_cache_backend="mongo"
+        options={"expireAfterSeconds": 0},
+    ),
+    IndexSpec(
+        collection="image_extractions",
+        name="bands_prompt_key",
+        keys=[("bands", ASCENDING), ("prompt_key", ASCENDING)],
+        serves=[
+            IndexQuery(
+                description="ImageResultCache.find",
+                filter={
+                    "bands": {"$in": ["0:0000", "1:0000", "2:0000", "3:0000"]},
+                    "prompt_key": "gpt-4o:1",
+                },
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="image_extractions",
+        name="expires_at_ttl",
+        keys=[("expires_at", ASCENDING)],
+        # Removes each extraction once its expires_at has passed
+        options={"expireAfterSeconds": 0},
+    ),
+    IndexSpec(
+        collection="generation_jobs",
+        name="status_available_at",
+        keys=[("status", ASCENDING), ("available_at", ASCENDING)],
+        serves=[
+            IndexQuery(
+                description="MongoJobStore.claim",
+                filter={
+                    "status": {"$in": ["queued", "running"]},
+                    "available_at": {"$lte": datetime(2000, 1, 1, tzinfo=timezone.utc)},
+                },
+                sort=[("available_at", ASCENDING)],
+                limit=1,
+            ),
+        ],
+    ),
+    IndexSpec(
+        collection="generation_jobs",
+        name="expires_at_ttl",
+        keys=[("expires_at", ASCENDING)],
+        # Removes finished jobs after the retention period; pending ones have no expires_at
+        options={"expireAfterSeconds": 0},
+    ),
+]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Create every registered index. Safe to call on every startup.
+
+    Failures (e.g. existing duplicates blocking a unique index) are logged
+    rather than raised so the app can still start.
+    """
+    for spec in INDEXES:
+        try:
+            await db[spec.collection].create_indexes([spec.to_index_model()])
+        except OperationFailure as e:
+            logger.error(
+                "Could not create index %s on %s: %s", spec.name, spec.collection, e
+            )
+    logger.info("Ensured %d indexes", len(INDEXES))
+
+
+def _plan_index_names(plan: dict) -> list[str]:
+    """Collect the index names used anywhere in an explain() plan tree."""
+    names = []
+    if "indexName" in plan:
+        names.append(plan["indexName"])
+    if plan.get("stage") == "COLLSCAN":
+        names.append("COLLSCAN")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            names.extend(_plan_index_names(plan[key]))
+    for child in plan.get("inputStages", []):
+        names.extend(_plan_index_names(child))
+    return names
+
+
+async def explain_query(
+    db: AsyncIOMotorDatabase, spec: IndexSpec, query: IndexQuery
+) -> list[str]:
+    """Return the index names the winning plan uses for a query."""
+    cursor = db[spec.collection].find(query.filter)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    if query.limit:
+        cursor = cursor.limit(query.limit)
+    explain = await cursor.explain()
+    return _plan_index_names(explain["queryPlanner"]["winningPlan"])
+
+
+async def report(db: AsyncIOMotorDatabase) -> bool:
+    """Print which index each registered query uses. Returns False on any mismatch."""
+    ok = True
+    for spec in INDEXES:
+        print(f"{spec.collection}.{spec.name} {dict(spec.keys)} {spec.options or ''}")
+        for query in spec.serves:
+            used = await explain_query(db, spec, query)
+            status = "ok" if spec.name in used else "MISS"
+            ok = ok and spec.name in used
+            print(f"  [{status}] {query.description}: {', '.join(used) or 'no index'}")
+    return ok
+
+
+async def _main(apply: bool, show_report: bool) -> int:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.effective_mongodb_uri)
+    try:
+        db = client[settings.database_name]
+        if apply:
+            await ensure_indexes(db)
+        if show_report:
+            return 0 if await report(db) else 1
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage MongoDB indexes.")
+    parser.add_argument("--apply", action="store_true", help="create missing indexes")
+    parser.add_argument(
+        "--report", action="store_true", help="explain() each query and show the index used"
+    )
+    args = parser.parse_args()
+    if not (args.apply or args.report):
+        parser.error("pass --apply and/or --report")
+
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(asyncio.run(_main(args.apply, args.report)))
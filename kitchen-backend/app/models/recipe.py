@@ -1,5 +1,62 @@
+from datetime import datetime
+from typing import Annotated, Literal
+
 from pydantic import BaseModel, Field
 
+# "full" returns every field; "summary" skips ingredients/directions for list views
+RecipeView = Literal["full", "summary"]
+
+# "json" streams a single JSON array; "ndjson" streams one recipe per line
+StreamFormat = Literal["json", "ndjson"]
+
+# "ndjson" is one recipe per line, re-importable as is; "zip" adds the images
+ExportFormat = Literal["ndjson", "zip"]
+
+# Most prompts one batch-generate request may carry, e.g. a week or two of meals
+MAX_BATCH_PROMPTS = 20
+
+GenerationJobKind = Literal["prompt", "image"]
+
+# Jobs waiting for a retry are "queued" again, with the last error kept in error
+GenerationJobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class ImageVariant(BaseModel):
+    """One resized/re-encoded copy of a recipe image, for srcset."""
+
+    url: str
+    width: int
+    content_type: str
+
+
+class StoredImage(BaseModel):
+    """An uploaded image: the JPEG fallback URL plus its responsive variants."""
+
+    url: str
+    variants: list[ImageVariant] = Field(default_factory=list)
+
+
+class ImageUploadRequest(BaseModel):
+    """Request for a signed URL to upload a recipe image straight to storage."""
+
+    content_type: str = Field(..., pattern=r"^image/[\w.+-]+$")
+
+
+class ImageUploadTicket(BaseModel):
+    """Where to PUT the image and with which headers, then pass object_name to finalize."""
+
+    upload_url: str
+    method: str = "PUT"
+    headers: dict[str, str]
+    object_name: str
+    expires_at: datetime
+
+
+class ImageFinalizeRequest(BaseModel):
+    """Records a directly uploaded image on its recipe."""
+
+    object_name: str
+
 
 class RecipeBase(BaseModel):
     """Base schema with fields shared by all recipe models."""
@@ -24,20 +81,130 @@ class RecipeResponse(RecipeBase):
     is_public: bool
     user_id: str
     image_url: str | None = None
+    image_variants: list[ImageVariant] = Field(default_factory=list)
 
 
-class RecipeUpdate(RecipeBase):
-    """Schema for updating a recipe. Includes id in body to identify the recipe."""
+class RecipeSummary(BaseModel):
+    """Schema for list views. Omits ingredients and directions to keep pages small."""
 
     id: str
+    title: str
+    description: str
+    ingredient_count: int = 0
     is_public: bool
+    user_id: str
     image_url: str | None = None
+    image_variants: list[ImageVariant] = Field(default_factory=list)
+
+
+class RecipePage(BaseModel):
+    """Schema for a page of recipes. Pass next_cursor back as `cursor` to get the next page."""
+
+    items: list[RecipeResponse] | list[RecipeSummary]
+    next_cursor: str | None = None
+
+
+class PantryMatch(BaseModel):
+    """A recipe and how much of it the caller's pantry covers."""
+
+    recipe: RecipeResponse | RecipeSummary
+    coverage: float  # Fraction of the recipe's distinct ingredients in the pantry
+    matched: int
+    missing: list[str]  # Normalized names of the ingredients still needed
+
+
+class PantryMatchPage(BaseModel):
+    """Schema for a page of pantry matches, best coverage first."""
+
+    items: list[PantryMatch]
+    next_cursor: str | None = None
+
+
+class RecipeUpdate(RecipeBase):
+    """Schema for updating a recipe. Includes id in body to identify the recipe.
+
+    The image is changed only through the image routes, which keep its
+    reference count; an image_url sent here is ignored.
+    """
+
+    id: str
+    is_public: bool
+
+
+class RecipeImportError(BaseModel):
+    """Why one line of a bulk import was skipped. Lines are numbered from 1."""
+
+    line: int
+    error: str
+
+
+class RecipeImportResult(BaseModel):
+    """Outcome of a bulk import. errors lists only the first few failures."""
+
+    imported: int
+    failed: int
+    errors: list[RecipeImportError]
+
+
+class RecipeImportTruncated(RecipeImportResult):
+    """413 detail for an import whose body went over the size limit.
+
+    Earlier batches are already saved: every line up to last_line was
+    imported or reported in errors, so a retry can resume after it.
+    """
+
+    error: Literal["truncated"] = "truncated"
+    message: str
+    last_line: int
 
 
 class GenerateFromPromptRequest(BaseModel):
     """Schema for the generate-from-prompt endpoint."""
 
     promptText: str = Field(..., min_length=1)
+    regenerate: bool = False  # Skip the prompt cache and generate a fresh recipe
+
+
+class BatchGenerateRequest(BaseModel):
+    """Schema for the batch-generate endpoint. save stores every result for the caller."""
+
+    prompts: list[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_PROMPTS
+    )
+    regenerate: bool = False
+    save: bool = False  # Requires authentication
+    is_public: bool = False  # Visibility of saved recipes
+
+
+class GenerationJob(BaseModel):
+    """A queued recipe generation. recipe is set once status is "succeeded"."""
+
+    id: str
+    kind: GenerationJobKind
+    status: GenerationJobStatus
+    attempts: int
+    recipe: RecipeCreate | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+
+def recipe_dict_from_mongo(doc: dict) -> dict:
+    """Transform a MongoDB document into a plain dict with the RecipeResponse fields.
+
+    Used directly by the streaming endpoints to skip the Pydantic round trip.
+    """
+    return {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "description": doc["description"],
+        "ingredients": doc.get("ingredients", []),
+        "directions": doc.get("directions", []),
+        "is_public": doc.get("is_public", False),
+        "user_id": doc["user_id"],
+        "image_url": doc.get("image_url"),
+        "image_variants": doc.get("image_variants", []),
+    }
 
 
 def recipe_from_mongo(doc: dict) -> RecipeResponse:
@@ -45,13 +212,37 @@ def recipe_from_mongo(doc: dict) -> RecipeResponse:
 
     MongoDB stores the ID as '_id' (ObjectId), but our API returns 'id' (string).
     """
-    return RecipeResponse(
-        id=str(doc["_id"]),
-        title=doc["title"],
-        description=doc["description"],
-        ingredients=doc.get("ingredients", []),
-        directions=doc.get("directions", []),
-        is_public=doc.get("is_public", False),
-        user_id=doc["user_id"],
-        image_url=doc.get("image_url"),
+    return RecipeResponse(**recipe_dict_from_mongo(doc))
+
+
+def recipe_summary_dict_from_mongo(doc: dict) -> dict:
+    """Transform a summary-projected MongoDB document into a plain dict."""
+    return {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "description": doc["description"],
+        "ingredient_count": doc.get("ingredient_count", 0),
+        "is_public": doc.get("is_public", False),
+        "user_id": doc["user_id"],
+        "image_url": doc.get("image_url"),
+        "image_variants": doc.get("image_variants", []),
+    }
+
+
+def recipe_summary_from_mongo(doc: dict) -> RecipeSummary:
+    """Transform a summary-projected MongoDB document into a RecipeSummary."""
+    return RecipeSummary(**recipe_summary_dict_from_mongo(doc))
+
+
+def generation_job_from_mongo(doc: dict) -> GenerationJob:
+    """Transform a generation_jobs document into a GenerationJob, leaving out the payload."""
+    return GenerationJob(
+        id=doc["_id"],
+        kind=doc["kind"],
+        status=doc["status"],
+        attempts=doc.get("attempts", 0),
+        recipe=doc.get("recipe"),
+        error=doc.get("error"),
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"],
     )
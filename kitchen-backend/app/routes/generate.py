@@ -1,14 +1,39 @@
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from collections.abc import AsyncIterator
 
-from app.models.recipe import GenerateFromPromptRequest, RecipeCreate
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
+
+from app.clients import get_openai_client
+from app.models.recipe import (
+    BatchGenerateRequest,
+    GenerateFromPromptRequest,
+    GenerationJob,
+    RecipeCreate,
+    generation_job_from_mongo,
+)
+from app.routes.recipes import get_recipe_service
+from app.services.auth_service import get_current_user_optional
 from app.services.generate_service import GenerateService
+from app.services.generation_queue import GenerationQueue, get_generation_queue
+from app.services.image_ingest import ImageIngestor, get_image_ingestor
+from app.services.recipe_service import RecipeService
+from app.services.storage_service import InvalidImageError
+from app.streaming import stream_events
 
 router = APIRouter(prefix="/api/generate", tags=["generate"])
 
 
-def get_generate_service() -> GenerateService:
-    """Dependency that creates a GenerateService."""
-    return GenerateService()
+def get_generate_service(
+    client: AsyncOpenAI = Depends(get_openai_client),
+    queue: GenerationQueue = Depends(get_generation_queue),
+) -> GenerateService:
+    """Dependency that creates a GenerateService with the shared OpenAI client.
+
+    Its OpenAI calls take a slot from the generation queue, so direct
+    requests count against the same concurrency and rate limit as jobs.
+    """
+    return GenerateService(client, limit=queue.slot)
 
 
 @router.post("/from-prompt", response_model=RecipeCreate)
@@ -17,17 +42,152 @@ async def generate_from_prompt(
     service: GenerateService = Depends(get_generate_service),
 ) -> RecipeCreate:
     """Generate a recipe from a text prompt using AI."""
-    return await service.recipe_from_prompt(request.promptText)
+    return await service.recipe_from_prompt(request.promptText, request.regenerate)
+
+
+@router.post("/from-prompt/stream")
+async def stream_from_prompt(
+    request: GenerateFromPromptRequest,
+    service: GenerateService = Depends(get_generate_service),
+) -> StreamingResponse:
+    """Generate a recipe from a text prompt, streaming fields as Server-Sent Events.
+
+    Sends "delta" events ({"field", "delta"}, plus "index" for ingredients and
+    directions) as the model writes, then a "recipe" event with the final
+    RecipeCreate, or an "error" event if generation fails.
+    """
+    return stream_events(
+        service.stream_recipe_from_prompt(request.promptText, request.regenerate)
+    )
+
+
+async def _batch_events(
+    request: BatchGenerateRequest,
+    queue: GenerationQueue,
+    recipes: RecipeService,
+    user_id: str | None,
+) -> AsyncIterator[tuple[str, dict]]:
+    generated: list[tuple[list[int], RecipeCreate]] = []
+    failed = 0
+    async for indexes, result in queue.generate_many(request.prompts, request.regenerate):
+        for index in indexes:
+            event = {"index": index, "prompt": request.prompts[index]}
+            if isinstance(result, str):
+                event["error"] = result
+            else:
+                event["recipe"] = result.model_dump()
+            yield "result", event
+        if isinstance(result, str):
+            failed += len(indexes)
+        else:
+            generated.append((indexes, result))
+
+    if request.save and generated:
+        generated.sort(key=lambda item: item[0][0])
+        saved = await recipes.add_recipes(
+            [recipe.model_copy(update={"is_public": request.is_public}) for _, recipe in generated],
+            user_id,
+        )
+        yield "saved", {
+            "recipes": [
+                {"index": index, "id": recipe.id}
+                for (indexes, _), recipe in zip(generated, saved)
+                for index in indexes
+            ]
+        }
+    yield "done", {"succeeded": len(request.prompts) - failed, "failed": failed}
+
+
+@router.post("/batch")
+async def generate_batch(
+    request: BatchGenerateRequest,
+    user_id: str | None = Depends(get_current_user_optional),
+    queue: GenerationQueue = Depends(get_generation_queue),
+    recipes: RecipeService = Depends(get_recipe_service),
+) -> StreamingResponse:
+    """Generate recipes for several prompts concurrently, streaming each as Server-Sent Events.
+
+    Prompts run as generation jobs, under the same rate limit as every other
+    generation. Sends a "result" event ({"index", "prompt"} plus "recipe" or
+    "error") per prompt as it completes; repeated prompts are generated once.
+    With save, the successful recipes are then stored together and a "saved"
+    event maps each index to its recipe id. A final "done" event carries the
+    counts.
+    """
+    if request.save and user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sign in to save generated recipes",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return stream_events(_batch_events(request, queue, recipes, user_id))
 
 
 @router.post("/from-image", response_model=RecipeCreate)
 async def generate_from_image(
     image: UploadFile = File(...),
     service: GenerateService = Depends(get_generate_service),
+    ingestor: ImageIngestor = Depends(get_image_ingestor),
 ) -> RecipeCreate:
     """Extract a recipe from an uploaded image using AI vision."""
-    if not image.content_type or not image.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    ingested = await ingestor.read(image)
+    try:
+        return await service.recipe_from_image(ingested.data)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/jobs/from-prompt",
+    response_model=GenerationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_prompt_job(
+    request: GenerateFromPromptRequest,
+    queue: GenerationQueue = Depends(get_generation_queue),
+) -> GenerationJob:
+    """Queue a recipe generation from a text prompt. Poll /jobs/{job_id} for the result."""
+    job = await queue.submit_prompt(request.promptText, request.regenerate)
+    return generation_job_from_mongo(job)
+
+
+@router.post(
+    "/jobs/from-image",
+    response_model=GenerationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_image_job(
+    image: UploadFile = File(...),
+    queue: GenerationQueue = Depends(get_generation_queue),
+    ingestor: ImageIngestor = Depends(get_image_ingestor),
+) -> GenerationJob:
+    """Queue a recipe extraction from an uploaded image. Poll /jobs/{job_id} for the result."""
+    ingested = await ingestor.read(image)
+    job = await queue.submit_image(ingested.data)
+    return generation_job_from_mongo(job)
+
+
+@router.get("/jobs/{job_id}", response_model=GenerationJob)
+async def get_job(
+    job_id: str,
+    queue: GenerationQueue = Depends(get_generation_queue),
+) -> GenerationJob:
+    """Get a generation job's status, and its recipe once it has succeeded."""
+    job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return generation_job_from_mongo(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def watch_job(
+    job_id: str,
+    queue: GenerationQueue = Depends(get_generation_queue),
+) -> StreamingResponse:
+    """Push a generation job's status as Server-Sent Events until it finishes.
 
-    image_data = await image.read()
-    return await service.recipe_from_image(image_data, image.content_type)
+    Sends a "job" event (a GenerationJob) each time the job changes.
+    """
+    if await queue.get(job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return stream_events(queue.watch(job_id))
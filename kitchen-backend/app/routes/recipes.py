@@ -1,11 +1,56 @@
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from datetime import datetime, timedelta, timezone
+from pathlib import PurePosixPath
+from urllib.parse import urlparse
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from app.config import get_settings
 from app.database import get_database
-from app.models.recipe import RecipeCreate, RecipeResponse, RecipeUpdate
+from app.models.recipe import (
+    ExportFormat,
+    ImageFinalizeRequest,
+    ImageUploadRequest,
+    ImageUploadTicket,
+    PantryMatchPage,
+    RecipeCreate,
+    RecipeImportResult,
+    RecipePage,
+    RecipeResponse,
+    RecipeUpdate,
+    RecipeView,
+    StoredImage,
+    StreamFormat,
+    recipe_dict_from_mongo,
+    recipe_summary_dict_from_mongo,
+)
 from app.services.auth_service import get_current_user, get_current_user_optional
-from app.services.recipe_service import RecipeService
-from app.services.storage_service import StorageService, get_storage_service
+from app.services.image_ingest import (
+    HTTP_413_CONTENT_TOO_LARGE,
+    ImageIngestor,
+    get_image_ingestor,
+)
+from app.services.image_refs import ImageRefs
+from app.services.image_worker import ImageJob, ImageWorker, get_image_worker
+from app.services.recipe_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, RecipeService
+from app.services.storage_service import (
+    InvalidImageError,
+    StorageService,
+    get_storage_service,
+)
+from app.streaming import ndjson_lines, stream_documents, zip_chunks
 
 router = APIRouter(prefix="/api/recipes", tags=["recipes"])
 
@@ -17,21 +62,167 @@ def get_recipe_service(
     return RecipeService(db)
 
 
-@router.get("", response_model=list[RecipeResponse])
+def get_image_refs(db: AsyncIOMotorDatabase = Depends(get_database)) -> ImageRefs:
+    """Dependency that creates ImageRefs with the database."""
+    return ImageRefs(db)
+
+
+@router.get("", response_model=RecipePage)
 async def get_public_recipes(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    view: RecipeView = "full",
     service: RecipeService = Depends(get_recipe_service),
-) -> list[RecipeResponse]:
-    """Get all public recipes."""
-    return await service.get_public()
+) -> RecipePage:
+    """Get a page of public recipes. Pass next_cursor back as `cursor` for the next page."""
+    return await service.get_public(limit, cursor, view)
 
 
-@router.get("/mine", response_model=list[RecipeResponse])
+@router.get("/mine", response_model=RecipePage)
 async def get_my_recipes(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    view: RecipeView = "full",
     user_id: str = Depends(get_current_user),
     service: RecipeService = Depends(get_recipe_service),
-) -> list[RecipeResponse]:
-    """Get all recipes owned by the current user. Requires authentication."""
-    return await service.get_by_user(user_id)
+) -> RecipePage:
+    """Get a page of recipes owned by the current user. Requires authentication."""
+    return await service.get_by_user(user_id, limit, cursor, view)
+
+
+def _stream_transform(view: RecipeView):
+    return recipe_summary_dict_from_mongo if view == "summary" else recipe_dict_from_mongo
+
+
+@router.get("/stream")
+async def stream_public_recipes(
+    stream_format: StreamFormat = Query("json", alias="format"),
+    view: RecipeView = "full",
+    service: RecipeService = Depends(get_recipe_service),
+) -> StreamingResponse:
+    """Stream every public recipe as a JSON array or NDJSON, without pagination."""
+    return stream_documents(
+        service.stream_public(view), _stream_transform(view), stream_format
+    )
+
+
+@router.get("/mine/stream")
+async def stream_my_recipes(
+    stream_format: StreamFormat = Query("json", alias="format"),
+    view: RecipeView = "full",
+    user_id: str = Depends(get_current_user),
+    service: RecipeService = Depends(get_recipe_service),
+) -> StreamingResponse:
+    """Stream every recipe owned by the current user. Requires authentication."""
+    return stream_documents(
+        service.stream_by_user(user_id, view), _stream_transform(view), stream_format
+    )
+
+
+@router.get("/search", response_model=RecipePage)
+async def search_recipes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    view: RecipeView = "full",
+    user_id: str | None = Depends(get_current_user_optional),
+    service: RecipeService = Depends(get_recipe_service),
+) -> RecipePage:
+    """Search titles, descriptions and ingredients, best match first.
+
+    Covers public recipes, plus the caller's own when authenticated. Supports
+    "quoted phrases" and -excluded words. Pass next_cursor back as `cursor`
+    for the next page.
+    """
+    return await service.search(q, user_id, limit, cursor, view)
+
+
+@router.get("/pantry", response_model=PantryMatchPage)
+async def match_pantry(
+    ingredients: list[str] = Query(..., min_length=1, max_length=100),
+    min_coverage: float = Query(0.0, ge=0.0, le=1.0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    view: RecipeView = "full",
+    user_id: str | None = Depends(get_current_user_optional),
+    service: RecipeService = Depends(get_recipe_service),
+) -> PantryMatchPage:
+    """Find recipes you can cook from what you have, most fully covered first.
+
+    Pass each ingredient as a repeated `ingredients` parameter, in any form
+    ("2 cups tomatoes" matches "tomato"). Covers public recipes, plus the
+    caller's own when authenticated. Pass next_cursor back as `cursor` for
+    the next page.
+    """
+    return await service.pantry_matches(ingredients, user_id, min_coverage, limit, cursor, view)
+
+
+@router.post("/import", response_model=RecipeImportResult)
+async def import_recipes(
+    request: Request,
+    user_id: str = Depends(get_current_user),
+    service: RecipeService = Depends(get_recipe_service),
+    refs: ImageRefs = Depends(get_image_refs),
+    storage: StorageService = Depends(get_storage_service),
+) -> RecipeImportResult:
+    """Import recipes from an NDJSON body, one RecipeCreate per line. Requires authentication.
+
+    The body is read as it arrives and written in batches. Lines that fail
+    validation are skipped and reported; the rest are imported. A body that
+    streams past the size limit gets a 413 whose detail is a
+    RecipeImportTruncated, since the batches before the cut are saved.
+    """
+    max_bytes = get_settings().import_max_bytes
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(
+            status_code=HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Import must be at most {max_bytes // 1_000_000} MB",
+        )
+    return await service.import_recipes(
+        ndjson_lines(request.stream(), max_bytes), user_id, refs, storage
+    )
+
+
+async def _export_files(
+    docs: AsyncIterable[dict], storage: StorageService
+) -> AsyncIterator[tuple[str, bytes]]:
+    """Yield each recipe's image, then recipes.ndjson with image_file pointing at them."""
+    lines = []
+    async for doc in docs:
+        recipe = recipe_dict_from_mongo(doc)
+        if recipe["image_url"]:
+            image = await storage.read_image(recipe["image_url"])
+            if image is not None:
+                suffix = PurePosixPath(urlparse(recipe["image_url"]).path).suffix or ".jpg"
+                recipe["image_file"] = f"images/{recipe['id']}{suffix}"
+                yield recipe["image_file"], image
+        lines.append(json.dumps(recipe, ensure_ascii=False) + "\n")
+    yield "recipes.ndjson", "".join(lines).encode("utf-8")
+
+
+@router.get("/mine/export")
+async def export_my_recipes(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    user_id: str = Depends(get_current_user),
+    service: RecipeService = Depends(get_recipe_service),
+    storage: StorageService = Depends(get_storage_service),
+) -> StreamingResponse:
+    """Download every recipe owned by the current user. Requires authentication.
+
+    "ndjson" can be passed straight back to /import. "zip" holds the images
+    under images/ and a recipes.ndjson whose image_file fields refer to them.
+    """
+    filename = f"recipes-{datetime.now(timezone.utc):%Y-%m-%d}.{export_format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    docs = service.stream_by_user(user_id)
+    if export_format == "ndjson":
+        return stream_documents(docs, recipe_dict_from_mongo, "ndjson", headers)
+    return StreamingResponse(
+        zip_chunks(_export_files(docs, storage)),
+        media_type="application/zip",
+        headers=headers,
+    )
 
 
 @router.get("/{recipe_id}", response_model=RecipeResponse)
@@ -60,9 +251,11 @@ async def create_recipe(
     recipe: RecipeCreate,
     user_id: str = Depends(get_current_user),
     service: RecipeService = Depends(get_recipe_service),
+    refs: ImageRefs = Depends(get_image_refs),
+    storage: StorageService = Depends(get_storage_service),
 ) -> RecipeResponse:
     """Create a new recipe. Requires authentication."""
-    return await service.add_recipe(recipe, user_id)
+    return await service.add_recipe(recipe, user_id, refs, storage)
 
 
 @router.put("/{recipe_id}", response_model=RecipeResponse)
@@ -73,18 +266,7 @@ async def update_recipe(
     service: RecipeService = Depends(get_recipe_service),
 ) -> RecipeResponse:
     """Update an existing recipe. Requires authentication and ownership."""
-    existing = await service.find_by_id(recipe_id)
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Recipe not found",
-        )
-    if existing.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't own this recipe",
-        )
-    return await service.update_recipe(recipe_id, recipe)
+    return await service.update_owned(recipe_id, user_id, recipe)
 
 
 @router.delete("/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -92,20 +274,15 @@ async def delete_recipe(
     recipe_id: str,
     user_id: str = Depends(get_current_user),
     service: RecipeService = Depends(get_recipe_service),
+    storage: StorageService = Depends(get_storage_service),
+    refs: ImageRefs = Depends(get_image_refs),
 ) -> None:
     """Delete a recipe. Requires authentication and ownership."""
-    existing = await service.find_by_id(recipe_id)
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Recipe not found",
-        )
-    if existing.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't own this recipe",
-        )
-    await service.delete_by_id(recipe_id)
+    deleted = await service.delete_owned(recipe_id, user_id)
+
+    # Release its image; it is deleted if no other recipe uses it
+    if deleted.image_url:
+        await storage.delete_image(deleted.image_url, refs, deleted.image_variants)
 
 
 @router.post("/{recipe_id}/image", response_model=RecipeResponse)
@@ -115,39 +292,165 @@ async def upload_recipe_image(
     user_id: str = Depends(get_current_user),
     service: RecipeService = Depends(get_recipe_service),
     storage: StorageService = Depends(get_storage_service),
+    refs: ImageRefs = Depends(get_image_refs),
+    ingestor: ImageIngestor = Depends(get_image_ingestor),
 ) -> RecipeResponse:
     """Upload an image for a recipe. Requires authentication and ownership."""
-    if not image.content_type or not image.content_type.startswith("image/"):
+    if not storage.is_configured():
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be an image",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image storage is not configured",
         )
 
-    existing = await service.find_by_id(recipe_id)
-    if not existing:
+    # Fail fast for non-owners, before the expensive ingest and resize; the
+    # update below checks again in case the recipe changes hands meanwhile
+    await service.get_owned(recipe_id, user_id)
+
+    # Read in chunks, checking size, format and pixel count on the way
+    ingested = await ingestor.read(image)
+    try:
+        stored = await storage.upload_image(ingested.data, ingested.content_type, refs)
+    except InvalidImageError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Recipe not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
         )
-    if existing.user_id != user_id:
+
+    # Swap the image on the recipe, checking ownership in the same operation
+    try:
+        updated, previous = await service.update_owned_image(recipe_id, user_id, stored)
+    except HTTPException:
+        await storage.delete_image(stored.url, refs, stored.variants)
+        raise
+
+    # Release the old image; it is deleted if no other recipe uses it
+    if previous.image_url:
+        await storage.delete_image(previous.image_url, refs, previous.image_variants)
+
+    return updated
+
+
+@router.delete("/{recipe_id}/image", response_model=RecipeResponse)
+async def delete_recipe_image(
+    recipe_id: str,
+    user_id: str = Depends(get_current_user),
+    service: RecipeService = Depends(get_recipe_service),
+    storage: StorageService = Depends(get_storage_service),
+    refs: ImageRefs = Depends(get_image_refs),
+) -> RecipeResponse:
+    """Remove a recipe's image. Requires authentication and ownership."""
+    updated, previous = await service.update_owned_image(recipe_id, user_id, None)
+
+    # Release the image; it is deleted if no other recipe uses it
+    if previous.image_url:
+        await storage.delete_image(previous.image_url, refs, previous.image_variants)
+
+    return updated
+
+
+@router.post("/{recipe_id}/image/upload-url", response_model=ImageUploadTicket)
+async def create_image_upload_url(
+    recipe_id: str,
+    request: ImageUploadRequest,
+    user_id: str = Depends(get_current_user),
+    service: RecipeService = Depends(get_recipe_service),
+    storage: StorageService = Depends(get_storage_service),
+) -> ImageUploadTicket:
+    """Issue a short-lived signed URL to upload a recipe image straight to storage.
+
+    The client PUTs the original to upload_url with the returned headers, then
+    calls finalize with object_name. Requires authentication and ownership.
+    """
+    if not storage.is_configured():
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't own this recipe",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image storage is not configured",
         )
+    await service.get_owned(recipe_id, user_id)
+
+    settings = get_settings()
+    object_name = storage.upload_name(recipe_id)
+    upload_url, headers = storage.create_upload_url(object_name, request.content_type)
+    return ImageUploadTicket(
+        upload_url=upload_url,
+        headers=headers,
+        object_name=object_name,
+        expires_at=datetime.now(timezone.utc)
+        + timedelta(seconds=settings.direct_upload_expire_seconds),
+    )
 
+
+@router.post("/{recipe_id}/image/finalize", response_model=RecipeResponse)
+async def finalize_image_upload(
+    recipe_id: str,
+    request: ImageFinalizeRequest,
+    user_id: str = Depends(get_current_user),
+    service: RecipeService = Depends(get_recipe_service),
+    storage: StorageService = Depends(get_storage_service),
+    refs: ImageRefs = Depends(get_image_refs),
+    worker: ImageWorker = Depends(get_image_worker),
+) -> RecipeResponse:
+    """Record a directly uploaded image on its recipe. Requires authentication and ownership.
+
+    The original is compressed into the usual variants, either before this
+    returns or, with background processing enabled, by the image worker while
+    the recipe briefly shows the original.
+    """
     if not storage.is_configured():
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Image storage is not configured",
         )
+    if not storage.is_upload_for(request.object_name, recipe_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown upload",
+        )
+    await service.get_owned(recipe_id, user_id)
+
+    settings = get_settings()
+    original_url = storage.url_for(request.object_name)
+    size = await storage.upload_size(request.object_name)
+    if size is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found",
+        )
+    if size > settings.direct_upload_max_bytes:
+        await storage.delete_upload(request.object_name)
+        raise HTTPException(
+            status_code=HTTP_413_CONTENT_TOO_LARGE,
+            detail="Image is too large",
+        )
+
+    if settings.image_background_processing:
+        # Show the original now; the worker swaps in the compressed image
+        image = StoredImage(url=original_url)
+    else:
+        try:
+            image = await storage.process_upload(request.object_name, refs)
+        except InvalidImageError as e:
+            await storage.delete_upload(request.object_name)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+        await storage.delete_upload(request.object_name)
+
+    try:
+        updated, previous = await service.update_owned_image(recipe_id, user_id, image)
+    except HTTPException:
+        if settings.image_background_processing:
+            await storage.delete_upload(request.object_name)
+        else:
+            await storage.delete_image(image.url, refs, image.variants)
+        raise
 
-    # Delete old image if exists
-    if existing.image_url:
-        storage.delete_image(existing.image_url)
+    if settings.image_background_processing:
+        worker.submit(ImageJob(recipe_id=recipe_id, object_name=request.object_name))
 
-    # Upload new image
-    image_data = await image.read()
-    image_url = storage.upload_image(image_data, image.content_type)
+    # Release the old image, unless this is a repeated finalize of the same original
+    if previous.image_url and previous.image_url != original_url:
+        await storage.delete_image(previous.image_url, refs, previous.image_variants)
 
-    # Update recipe with new image URL
-    return await service.update_image(recipe_id, image_url)
+    return updated
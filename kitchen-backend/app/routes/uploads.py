@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.config import get_settings
+from app.services.image_ingest import HTTP_413_CONTENT_TOO_LARGE
+from app.services.storage_service import (
+    LOCAL_UPLOAD_PATH,
+    LocalStorageService,
+    StorageService,
+    get_storage_service,
+)
+
+router = APIRouter(prefix=LOCAL_UPLOAD_PATH, tags=["uploads"])
+
+
+@router.put("/{object_name:path}", status_code=status.HTTP_204_NO_CONTENT)
+async def put_upload(
+    object_name: str,
+    request: Request,
+    expires: int,
+    signature: str,
+    storage: StorageService = Depends(get_storage_service),
+) -> None:
+    """Accept a signed direct upload when storage is local, standing in for a bucket."""
+    if not isinstance(storage, LocalStorageService):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    content_type = request.headers.get("content-type", "")
+    if not storage.verify_upload(object_name, content_type, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired upload URL",
+        )
+
+    # Read the body in chunks so an oversized upload is cut off early
+    max_bytes = get_settings().direct_upload_max_bytes
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(
+                status_code=HTTP_413_CONTENT_TOO_LARGE,
+                detail="Image is too large",
+            )
+        chunks.append(chunk)
+
+    await storage.save_upload(object_name, b"".join(chunks), content_type)
@@ -1,13 +1,12 @@
+import hmac
 from datetime import datetime, timedelta, timezone
 
-import httpx
 from bson import ObjectId
 from bson.errors import InvalidId
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from passlib.context import CryptContext
 
 from app.config import Settings, get_settings
 from app.models.user import (
@@ -17,24 +16,14 @@ from app.models.user import (
     user_from_mongo,
     user_in_db_from_mongo,
 )
-
-# Password hashing context - bcrypt with auto-upgrade support
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.google_keys import GoogleTokenVerifier, get_google_verifier
+from app.services.password_hasher import PasswordHasher, get_password_hasher
+from app.services.token_cache import get_token_cache
 
 # HTTP Bearer token extractor for protected routes
 bearer_scheme = HTTPBearer()
 
 
-def hash_password(password: str) -> str:
-    """Hash a plain-text password using bcrypt."""
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain-text password against a bcrypt hash."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-
 def create_access_token(user_id: str, settings: Settings) -> str:
     """Create a JWT access token for the given user ID."""
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expire_minutes)
@@ -49,52 +38,65 @@ def verify_token(token: str, settings: Settings) -> str | None:
     """Verify a JWT token and return the user ID if valid.
 
     Returns None if the token is invalid or expired.
+    Tokens that verified before are answered from the token cache until they expire.
     """
+    cache = get_token_cache()
+    user_id = cache.get(token, settings.jwt_secret, settings.jwt_algorithm)
+    if user_id:
+        return user_id
+
     try:
         payload = jwt.decode(
             token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
         )
-        user_id: str = payload.get("sub")
-        return user_id
     except JWTError:
         return None
 
+    user_id = payload.get("sub")
+    expires_at = payload.get("exp")
+    if user_id and expires_at is not None:
+        cache.set(token, user_id, expires_at, settings.jwt_secret, settings.jwt_algorithm)
+    return user_id
+
 
-async def verify_google_token(credential: str, settings: Settings) -> dict | None:
+async def verify_google_token(
+    credential: str,
+    settings: Settings,
+    verifier: GoogleTokenVerifier | None = None,
+) -> dict | None:
     """Verify a Google OAuth credential and return the user info.
 
-    Calls Google's tokeninfo endpoint to validate the token.
+    Checks the ID token's signature locally against Google's cached public keys.
     Returns None if invalid or if the token wasn't issued for our app.
     """
     if not settings.google_client_id:
         return None
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://oauth2.googleapis.com/tokeninfo?id_token={credential}"
-        )
-
-    if response.status_code != 200:
-        return None
-
-    token_info = response.json()
-
-    # Verify the token was issued for our app (prevents token substitution attacks)
-    if token_info.get("aud") != settings.google_client_id:
+    verifier = verifier or get_google_verifier()
+    # Audience check prevents token substitution attacks
+    claims = await verifier.verify(credential, settings.google_client_id)
+    if not claims:
         return None
 
     return {
-        "email": token_info.get("email"),
-        "name": token_info.get("name"),
-        "google_id": token_info.get("sub"),  # Google's unique user ID
+        "email": claims.get("email"),
+        "name": claims.get("name"),
+        "google_id": claims.get("sub"),  # Google's unique user ID
     }
 
 
 class AuthService:
     """Service for user authentication and management."""
 
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        hasher: PasswordHasher | None = None,
+        google_verifier: GoogleTokenVerifier | None = None,
+    ):
         self.collection = db["users"]
+        self.hasher = hasher or get_password_hasher()
+        self.google_verifier = google_verifier
 
     async def find_by_email(self, email: str) -> UserInDB | None:
         """Find a user by email. Returns internal representation with hashed password."""
@@ -117,7 +119,10 @@ class AuthService:
 
     async def find_by_google_id(self, google_id: str) -> UserInDB | None:
         """Find a user by their Google ID."""
-        doc = await self.collection.find_one({"google_id": google_id})
+        # The $type predicate lets the planner use the partial google_id index
+        doc = await self.collection.find_one(
+            {"google_id": {"$eq": google_id, "$type": "string"}}
+        )
         if doc:
             return user_in_db_from_mongo(doc)
         return None
@@ -152,7 +157,7 @@ class AuthService:
                 detail="Email already registered",
             )
 
-        hashed = hash_password(user_data.password)
+        hashed = await self.hasher.hash(user_data.password)
         return await self.create_user(
             email=user_data.email,
             name=user_data.name,
@@ -170,7 +175,7 @@ class AuthService:
         if not user.hashed_password:
             # User registered via OAuth, no password set
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await self.hasher.verify(password, user.hashed_password):
             return None
 
         return UserResponse(id=user.id, email=user.email, name=user.name)
@@ -184,7 +189,9 @@ class AuthService:
         If not, creates a new user.
         Returns None if the Google token is invalid.
         """
-        google_info = await verify_google_token(credential, settings)
+        google_info = await verify_google_token(
+            credential, settings, self.google_verifier
+        )
         if not google_info:
             return None
 
@@ -251,3 +258,24 @@ async def get_current_user_optional(
 
     user_id = verify_token(credentials.credentials, settings)
     return user_id
+
+
+async def require_metrics_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_bearer_scheme),
+    settings: Settings = Depends(get_settings),
+) -> None:
+    """FastAPI dependency that guards /metrics with the configured METRICS_TOKEN.
+
+    Without a configured token the endpoint is disabled and answers 404, so
+    an unconfigured deployment never exposes its counters.
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not hmac.compare_digest(
+        credentials.credentials.encode(), settings.metrics_token.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,10 +1,63 @@
 import base64
+import copy
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, nullcontext
 
+import openai
+from fastapi import HTTPException
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 
 from app.config import get_settings
 from app.models.recipe import RecipeCreate
+from app.services.image_hash_cache import (
+    ImageResultCache,
+    get_image_result_cache,
+    image_dhash,
+)
+from app.services.prompt_cache import (
+    PromptCache,
+    get_prompt_cache,
+    prompt_cache_key,
+)
+from app.services.storage_service import (
+    InvalidImageError,
+    StorageService,
+    get_storage_service,
+)
+
+logger = logging.getLogger(__name__)
+
+PROMPT_SYSTEM_PROMPT = (
+    "Generate a recipe based on the prompt provided. "
+    "The recipe should have a title, a brief description, "
+    "a list of ingredients required, and a list of directions to follow."
+)
+
+# Part of the prompt cache key. Bump when PROMPT_SYSTEM_PROMPT or GeneratedRecipe
+# changes so cached recipes from the old prompt stop being served.
+PROMPT_SYSTEM_PROMPT_VERSION = 1
+
+VISION_MODEL = "gpt-4o"
+
+IMAGE_SYSTEM_PROMPT = (
+    "Extract the recipe from the provided image. "
+    "The recipe should have a title, a brief description, "
+    "a list of ingredients required, and a list of directions to follow. "
+    "If the image doesn't contain a recipe, infer what recipe it might be "
+    "based on the food shown and generate a plausible recipe for it."
+)
+
+# Part of the image cache key, like PROMPT_SYSTEM_PROMPT_VERSION
+IMAGE_SYSTEM_PROMPT_VERSION = 1
+
+# The vision model scales high-detail images so the short side is at most 768
+# px and looks at low-detail ones at 512x512, so larger images only cost upload
+# time and memory
+VISION_HIGH_DETAIL_SHORT_EDGE = 768
+VISION_LOW_DETAIL_SIZE = 512
 
 
 class GeneratedRecipe(BaseModel):
@@ -16,35 +69,156 @@ class GeneratedRecipe(BaseModel):
     directions: list[str]
 
 
+# GeneratedRecipe fields in the order the model writes them
+STREAMED_FIELDS = ("title", "description", "ingredients", "directions")
+
+
+def recipe_deltas(sent: dict, partial: dict) -> list[dict]:
+    """Return the text added to each field between two partial recipes.
+
+    Partial JSON parsing only ever extends strings and lists, so each change
+    is an append: {"field", "delta"} for strings, plus "index" for list items.
+    """
+    deltas = []
+    for field in STREAMED_FIELDS:
+        value = partial.get(field)
+        if isinstance(value, str):
+            before = sent.get(field) or ""
+            if len(value) > len(before):
+                deltas.append({"field": field, "delta": value[len(before) :]})
+        elif isinstance(value, list):
+            sent_items = sent.get(field) or []
+            for index, item in enumerate(value):
+                if not isinstance(item, str):
+                    continue
+                before = sent_items[index] if index < len(sent_items) else ""
+                if len(item) > len(before):
+                    deltas.append({"field": field, "index": index, "delta": item[len(before) :]})
+    return deltas
+
+
+def generation_error_message(error: Exception) -> str:
+    """Describe a failed generation in terms that are safe to show the client."""
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    if isinstance(error, (InvalidImageError, ValueError)):
+        return str(error)
+    if isinstance(error, openai.RateLimitError):
+        return "OpenAI rate limit exceeded"
+    return "Generation failed"
+
+
 class GenerateService:
-    """Service for generating recipes using OpenAI."""
+    """Service for generating recipes using OpenAI.
 
-    def __init__(self):
+    Every OpenAI call runs inside `limit()`, e.g. GenerationQueue.slot, so
+    direct requests share the queue's concurrency and rate limit. Cache hits
+    don't call OpenAI and skip it.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        prompt_cache: PromptCache | None = None,
+        image_cache: ImageResultCache | None = None,
+        storage: StorageService | None = None,
+        limit: Callable[[], AbstractAsyncContextManager[None]] | None = None,
+    ):
         settings = get_settings()
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self.client = client
+        self.limit = limit or nullcontext
         self.model = settings.openai_model
+        self.prompt_cache = prompt_cache or get_prompt_cache()
+        self.image_cache = image_cache or get_image_result_cache()
+        self.storage = storage or get_storage_service()
+        self.image_detail = settings.vision_image_detail
+        self.image_long_edge = settings.vision_max_long_edge
 
-    async def recipe_from_prompt(self, prompt_text: str) -> RecipeCreate:
-        """Generate a recipe from a text prompt using OpenAI."""
-        completion = await self.client.beta.chat.completions.parse(
+    async def _cached_prompt_recipe(
+        self, key: str, regenerate: bool
+    ) -> RecipeCreate | None:
+        if regenerate:
+            self.prompt_cache.bypassed += 1
+            return None
+        start = time.perf_counter()
+        cached = await self.prompt_cache.get(key)
+        if cached is None:
+            return None
+        logger.info("Prompt cache hit in %.1f ms", (time.perf_counter() - start) * 1000)
+        return RecipeCreate(**cached)
+
+    async def cached_recipe_from_prompt(self, prompt_text: str) -> RecipeCreate | None:
+        """Return the cached recipe for a prompt without generating one, if there is one."""
+        key = prompt_cache_key(prompt_text, self.model, PROMPT_SYSTEM_PROMPT_VERSION)
+        return await self._cached_prompt_recipe(key, regenerate=False)
+
+    async def recipe_from_prompt(
+        self, prompt_text: str, regenerate: bool = False
+    ) -> RecipeCreate:
+        """Generate a recipe from a text prompt, reusing a cached result for the same prompt.
+
+        regenerate skips the cache lookup and replaces the cached recipe with a
+        fresh one.
+        """
+        key = prompt_cache_key(prompt_text, self.model, PROMPT_SYSTEM_PROMPT_VERSION)
+        cached = await self._cached_prompt_recipe(key, regenerate)
+        if cached is not None:
+            return cached
+
+        recipe = await self._generate_from_prompt(prompt_text)
+        await self.prompt_cache.set(key, recipe.model_dump())
+        return recipe
+
+    async def stream_recipe_from_prompt(
+        self, prompt_text: str, regenerate: bool = False
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Generate a recipe from a text prompt, yielding (event, data) pairs as it is written.
+
+        "delta" events carry text appended to one field, in the order the
+        model writes them (see recipe_deltas). A final "recipe" event carries
+        the validated RecipeCreate. Cached recipes are replayed as one delta
+        per field.
+        """
+        key = prompt_cache_key(prompt_text, self.model, PROMPT_SYSTEM_PROMPT_VERSION)
+        cached = await self._cached_prompt_recipe(key, regenerate)
+        if cached is not None:
+            for delta in recipe_deltas({}, cached.model_dump()):
+                yield "delta", delta
+            yield "recipe", cached.model_dump()
+            return
+
+        sent: dict = {}
+        async with self.limit(), self.client.beta.chat.completions.stream(
             model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Generate a recipe based on the prompt provided. "
-                        "The recipe should have a title, a brief description, "
-                        "a list of ingredients required, and a list of directions to follow."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": prompt_text,
-                },
-            ],
+            messages=self._prompt_messages(prompt_text),
             response_format=GeneratedRecipe,
-        )
+        ) as stream:
+            async for event in stream:
+                if event.type == "content.delta" and isinstance(event.parsed, dict):
+                    for delta in recipe_deltas(sent, event.parsed):
+                        yield "delta", delta
+                    sent = copy.deepcopy(event.parsed)
+            completion = await stream.get_final_completion()
+
+        recipe = self._recipe_from_completion(completion)
+        await self.prompt_cache.set(key, recipe.model_dump())
+        yield "recipe", recipe.model_dump()
 
+    @staticmethod
+    def _prompt_messages(prompt_text: str) -> list[dict]:
+        return [
+            {
+                "role": "system",
+                "content": PROMPT_SYSTEM_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": prompt_text,
+            },
+        ]
+
+    @staticmethod
+    def _recipe_from_completion(completion) -> RecipeCreate:
         parsed = completion.choices[0].message.parsed
         if parsed is None:
             raise ValueError("Failed to parse recipe from OpenAI response")
@@ -56,36 +230,83 @@ class GenerateService:
             directions=parsed.directions,
         )
 
-    async def recipe_from_image(self, image_data: bytes, content_type: str) -> RecipeCreate:
+    async def _generate_from_prompt(self, prompt_text: str) -> RecipeCreate:
+        """Generate a recipe from a text prompt using OpenAI."""
+        async with self.limit():
+            completion = await self.client.beta.chat.completions.parse(
+                model=self.model,
+                messages=self._prompt_messages(prompt_text),
+                response_format=GeneratedRecipe,
+            )
+        return self._recipe_from_completion(completion)
+
+    async def recipe_from_image(self, image_data: bytes) -> RecipeCreate:
+        """Extract a recipe from an image, reusing the result for a perceptually identical one.
+
+        Near-duplicates (the same photo resized or recompressed) are found by
+        perceptual hash and skip the vision call.
+        """
+        prompt_key = f"{VISION_MODEL}:{IMAGE_SYSTEM_PROMPT_VERSION}:{self.image_detail}"
+        phash = await self.storage._run_image(image_dhash, image_data)
+        cached = await self.image_cache.find(phash, prompt_key)
+        if cached is not None:
+            return RecipeCreate(**cached)
+
+        recipe = await self._extract_from_image(image_data)
+        await self.image_cache.add(phash, prompt_key, recipe.model_dump())
+        return recipe
+
+    async def _shrink_for_vision(self, image_data: bytes) -> tuple[bytes, tuple[int, int]]:
+        """Resize to the largest size the model uses at the configured detail level."""
+        if self.image_detail == "low":
+            return await self.storage.shrink_for_vision(
+                image_data, min(self.image_long_edge, VISION_LOW_DETAIL_SIZE), None
+            )
+        return await self.storage.shrink_for_vision(
+            image_data, self.image_long_edge, VISION_HIGH_DETAIL_SHORT_EDGE
+        )
+
+    async def _extract_from_image(self, image_data: bytes) -> RecipeCreate:
         """Extract a recipe from an image using OpenAI's vision API."""
-        base64_image = base64.b64encode(image_data).decode("utf-8")
-
-        completion = await self.client.beta.chat.completions.parse(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Extract the recipe from the provided image. "
-                        "The recipe should have a title, a brief description, "
-                        "a list of ingredients required, and a list of directions to follow. "
-                        "If the image doesn't contain a recipe, infer what recipe it might be "
-                        "based on the food shown and generate a plausible recipe for it."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{content_type};base64,{base64_image}"
+        shrunk, (width, height) = await self._shrink_for_vision(image_data)
+        base64_image = base64.b64encode(shrunk).decode("utf-8")
+
+        async with self.limit():
+            completion = await self.client.beta.chat.completions.parse(
+                model=VISION_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": IMAGE_SYSTEM_PROMPT,
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}",
+                                    "detail": self.image_detail,
+                                },
                             },
-                        },
-                    ],
-                },
-            ],
-            response_format=GeneratedRecipe,
+                        ],
+                    },
+                ],
+                response_format=GeneratedRecipe,
+            )
+
+        usage = completion.usage
+        logger.info(
+            "Vision request: %d -> %d bytes (%.0f%% saved) at %dx%d, detail=%s, "
+            "tokens prompt=%s completion=%s",
+            len(image_data),
+            len(shrunk),
+            100 * (1 - len(shrunk) / len(image_data)),
+            width,
+            height,
+            self.image_detail,
+            usage.prompt_tokens if usage else None,
+            usage.completion_tokens if usage else None,
         )
 
         parsed = completion.choices[0].message.parsed
@@ -0,0 +1,549 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+import openai
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument
+
+from app.clients import get_openai_client
+from app.config import get_settings
+from app.database import get_database
+from app.models.recipe import GenerationJobKind, RecipeCreate, generation_job_from_mongo
+from app.services.generate_service import GenerateService, generation_error_message
+from app.services.prompt_cache import normalize_prompt
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Transient OpenAI failures worth another attempt. Anything else fails the job.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`.
+
+    pause() blocks every caller for a while, so one rate-limited response
+    backs off all workers rather than just the one that saw it.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def retry_delay(
+    attempt: int, base: float, maximum: float, retry_after: float | None = None
+) -> float:
+    """Exponential backoff with jitter for the given (1-based) attempt, at least retry_after."""
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    delay = random.uniform(delay / 2, delay)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.RateLimitError) and error.code == "insufficient_quota":
+        # Out of credit, not rate limited; waiting won't help
+        return False
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class MongoJobStore:
+    """Generation jobs in a MongoDB collection, shared by every app process.
+
+    available_at is when a job may next be claimed: for a queued job, once
+    any retry delay is over; for a running one, once its lease runs out
+    (i.e. its worker has probably died). Updates are fenced on attempts, so a
+    worker whose lease was taken over can't overwrite the newer attempt.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return get_database()[self.collection_name]
+
+    async def create(self, job: dict) -> None:
+        await self.collection.insert_one(job)
+
+    async def get(self, job_id: str) -> dict | None:
+        return await self.collection.find_one({"_id": job_id}, {"payload": 0})
+
+    async def pending(self) -> int:
+        return await self.collection.count_documents(
+            {"status": {"$in": ["queued", "running"]}}
+        )
+
+    async def claim(self, lease_seconds: float) -> dict | None:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"status": {"$in": ["queued", "running"]}, "available_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "running",
+                    "available_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def update(self, job: dict, changes: dict, unset_payload: bool = False) -> None:
+        update: dict = {"$set": {**changes, "updated_at": datetime.now(timezone.utc)}}
+        if unset_payload:
+            update["$unset"] = {"payload": ""}
+        await self.collection.update_one(
+            {"_id": job["_id"], "attempts": job["attempts"]}, update
+        )
+
+    async def cancel(self, job_id: str, changes: dict) -> None:
+        await self.collection.update_one(
+            {"_id": job_id, "status": "queued"},
+            {
+                "$set": {**changes, "updated_at": datetime.now(timezone.utc)},
+                "$unset": {"payload": ""},
+            },
+        )
+
+
+class MemoryJobStore:
+    """Generation jobs in a dict, for tests and single-process development.
+
+    Behaves like MongoJobStore but jobs are lost on restart and invisible to
+    other processes. Finished jobs are dropped once expired, on the next create.
+    """
+
+    def __init__(self):
+        self.jobs: dict[str, dict] = {}
+
+    async def create(self, job: dict) -> None:
+        now = datetime.now(timezone.utc)
+        self.jobs = {
+            job_id: doc
+            for job_id, doc in self.jobs.items()
+            if doc.get("expires_at") is None or doc["expires_at"] > now
+        }
+        self.jobs[job["_id"]] = dict(job)
+
+    async def get(self, job_id: str) -> dict | None:
+        doc = self.jobs.get(job_id)
+        if doc is None:
+            return None
+        return {key: value for key, value in doc.items() if key != "payload"}
+
+    async def pending(self) -> int:
+        return sum(doc["status"] in ("queued", "running") for doc in self.jobs.values())
+
+    async def claim(self, lease_seconds: float) -> dict | None:
+        now = datetime.now(timezone.utc)
+        ready = [
+            doc
+            for doc in self.jobs.values()
+            if doc["status"] in ("queued", "running") and doc["available_at"] <= now
+        ]
+        if not ready:
+            return None
+        doc = min(ready, key=lambda d: d["available_at"])
+        doc.update(
+            status="running",
+            available_at=now + timedelta(seconds=lease_seconds),
+            updated_at=now,
+            attempts=doc["attempts"] + 1,
+        )
+        return dict(doc)
+
+    async def update(self, job: dict, changes: dict, unset_payload: bool = False) -> None:
+        doc = self.jobs.get(job["_id"])
+        if doc is None or doc["attempts"] != job["attempts"]:
+            return
+        doc.update(changes, updated_at=datetime.now(timezone.utc))
+        if unset_payload:
+            doc.pop("payload", None)
+
+    async def cancel(self, job_id: str, changes: dict) -> None:
+        doc = self.jobs.get(job_id)
+        if doc is None or doc["status"] != "queued":
+            return
+        doc.update(changes, updated_at=datetime.now(timezone.utc))
+        doc.pop("payload", None)
+
+
+JobStore = MongoJobStore | MemoryJobStore
+
+
+class GenerationQueue:
+    """Runs recipe generations as background jobs under a rate and concurrency limit.
+
+    submit_* store a job and return it straight away; the client polls get()
+    or watch() for the result. `concurrency` workers per process claim jobs
+    from the store, each OpenAI call first takes a token from the bucket, and
+    rate limits, timeouts and 5xx responses are retried with exponential
+    backoff. Generations that answer the request directly, outside a job,
+    share the same concurrency and bucket through slot(). The limits are per
+    process, so with N processes OpenAI sees up to N times as many calls.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        service_factory: Callable[[], GenerateService],
+        concurrency: int,
+        bucket: TokenBucket,
+        max_attempts: int,
+        retry_base_seconds: float,
+        retry_max_seconds: float,
+        max_pending: int,
+        lease_seconds: float,
+        retention_seconds: float,
+        poll_seconds: float,
+    ):
+        self.store = store
+        self.service_factory = service_factory
+        self.concurrency = concurrency
+        self.bucket = bucket
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: list[asyncio.Task] = []
+        self.in_flight = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"generation-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit_prompt(self, prompt_text: str, regenerate: bool = False) -> dict:
+        return await self._submit("prompt", {"prompt_text": prompt_text, "regenerate": regenerate})
+
+    async def submit_image(self, image_data: bytes) -> dict:
+        # Uploads are capped at max_upload_bytes, which keeps the document
+        # under MongoDB's 16 MB limit
+        return await self._submit("image", {"image": image_data})
+
+    async def _submit(self, kind: GenerationJobKind, payload: dict) -> dict:
+        if await self.store.pending() >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many recipes are being generated, please try again shortly",
+            )
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "payload": payload,
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.store.create(job)
+        self.submitted += 1
+        self._wakeup.set()
+        return {key: value for key, value in job.items() if key != "payload"}
+
+    async def get(self, job_id: str) -> dict | None:
+        return await self.store.get(job_id)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the concurrency slots and a bucket token for an OpenAI call.
+
+        Workers take one per job; GenerateService takes one around each call
+        it makes for a direct request. A rate-limited direct call pauses the
+        bucket like a failed job does.
+        """
+        async with self._slots:
+            await self.bucket.acquire()
+            self.in_flight += 1
+            try:
+                yield
+            except openai.RateLimitError as e:
+                self.rate_limited += 1
+                self.bucket.pause(
+                    retry_delay(1, self.retry_base_seconds, self.retry_max_seconds, _retry_after(e))
+                )
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def generate_many(
+        self, prompts: list[str], regenerate: bool = False
+    ) -> AsyncIterator[tuple[list[int], RecipeCreate | str]]:
+        """Generate recipes for several prompts as jobs, yielding each as it finishes.
+
+        Prompts that normalize to the same text are generated once; each
+        result is yielded with the indexes of every prompt it answers, as a
+        recipe or an error message. Cached recipes are yielded straight away.
+        The rest are queued like any other job, so they share the queue's
+        rate limit, concurrency and retries. Jobs still queued when the
+        caller stops listening are cancelled.
+        """
+        indexes: dict[str, list[int]] = {}
+        for index, prompt_text in enumerate(prompts):
+            indexes.setdefault(normalize_prompt(prompt_text), []).append(index)
+
+        service = self.service_factory()
+        waiting: dict[str, list[int]] = {}
+        try:
+            for prompt_indexes in indexes.values():
+                prompt_text = prompts[prompt_indexes[0]]
+                if not regenerate:
+                    cached = await service.cached_recipe_from_prompt(prompt_text)
+                    if cached is not None:
+                        yield prompt_indexes, cached
+                        continue
+                try:
+                    job = await self.submit_prompt(prompt_text, regenerate)
+                except HTTPException as e:
+                    yield prompt_indexes, str(e.detail)
+                    continue
+                waiting[job["_id"]] = prompt_indexes
+
+            while waiting:
+                await asyncio.sleep(self.poll_seconds)
+                for job_id in list(waiting):
+                    job = await self.store.get(job_id)
+                    if job is None:
+                        yield waiting.pop(job_id), "Generation failed"
+                    elif job["status"] == "succeeded":
+                        yield waiting.pop(job_id), RecipeCreate(**job["recipe"])
+                    elif job["status"] == "failed":
+                        yield waiting.pop(job_id), job["error"]
+        finally:
+            # The client went away; stop paying for results nobody will read
+            for job_id in waiting:
+                await self.store.cancel(
+                    job_id,
+                    {"status": "failed", "error": "Cancelled", "expires_at": self._expires_at()},
+                )
+
+    async def watch(self, job_id: str) -> AsyncIterator[tuple[str, dict]]:
+        """Yield a "job" event whenever the job changes, until it has finished."""
+        updated_at = None
+        while True:
+            job = await self.store.get(job_id)
+            if job is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+                )
+            if job["updated_at"] != updated_at:
+                updated_at = job["updated_at"]
+                yield "job", generation_job_from_mongo(job).model_dump(mode="json")
+            if job["status"] in FINISHED_STATUSES:
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                job = await self._next_job()
+            except Exception:
+                logger.exception("Could not claim a generation job")
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            try:
+                # Taken after the claim, so a pause set by a rate-limited
+                # response while this worker sat idle still holds it back
+                async with self.slot():
+                    await self._process(job)
+            except Exception:
+                # Only store errors get here; the job is retried once its lease expires
+                logger.exception("Could not record generation job %s", job["_id"])
+
+    async def _next_job(self) -> dict:
+        """Claim the next ready job, waiting for a local submit or the next poll."""
+        while True:
+            self._wakeup.clear()
+            job = await self.store.claim(self.lease_seconds)
+            if job is not None:
+                return job
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except TimeoutError:
+                pass
+
+    async def _process(self, job: dict) -> None:
+        try:
+            recipe = await self._execute(job)
+        except Exception as e:
+            await self._handle_failure(job, e)
+            return
+        await self.store.update(
+            job,
+            {
+                "status": "succeeded",
+                "recipe": recipe.model_dump(),
+                "error": None,
+                "expires_at": self._expires_at(),
+            },
+            unset_payload=True,
+        )
+        self.succeeded += 1
+
+    async def _execute(self, job: dict) -> RecipeCreate:
+        service = self.service_factory()
+        payload = job["payload"]
+        if job["kind"] == "image":
+            return await service.recipe_from_image(payload["image"])
+        return await service.recipe_from_prompt(payload["prompt_text"], payload["regenerate"])
+
+    async def _handle_failure(self, job: dict, error: Exception) -> None:
+        if isinstance(error, openai.RateLimitError):
+            self.rate_limited += 1
+
+        if _is_retryable(error) and job["attempts"] < self.max_attempts:
+            delay = retry_delay(
+                job["attempts"],
+                self.retry_base_seconds,
+                self.retry_max_seconds,
+                _retry_after(error),
+            )
+            if isinstance(error, openai.RateLimitError):
+                self.bucket.pause(delay)
+            logger.warning(
+                "Generation job %s attempt %d failed (%s), retrying in %.1f s",
+                job["_id"],
+                job["attempts"],
+                type(error).__name__,
+                delay,
+            )
+            await self.store.update(
+                job,
+                {
+                    "status": "queued",
+                    "available_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                    "error": generation_error_message(error),
+                },
+            )
+            self.retried += 1
+            return
+
+        logger.error(
+            "Generation job %s failed after %d attempts",
+            job["_id"],
+            job["attempts"],
+            exc_info=error,
+        )
+        await self.store.update(
+            job,
+            {
+                "status": "failed",
+                "error": generation_error_message(error),
+                "expires_at": self._expires_at(),
+            },
+            unset_payload=True,
+        )
+        self.failed += 1
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.retention_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "running": any(not task.done() for task in self._tasks),
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def _openai_generate_service() -> GenerateService:
+    # The queue does its own retries, so turn off the SDK's. Workers already
+    # hold a slot, so the service takes none of its own.
+    return GenerateService(get_openai_client().with_options(max_retries=0))
+
+
+@lru_cache
+def get_generation_queue() -> GenerationQueue:
+    """Return the process-wide generation job queue."""
+    settings = get_settings()
+    if settings.generation_job_backend == "memory":
+        store: JobStore = MemoryJobStore()
+    else:
+        store = MongoJobStore("generation_jobs")
+    return GenerationQueue(
+        store,
+        _openai_generate_service,
+        concurrency=settings.generation_concurrency,
+        bucket=TokenBucket(
+            settings.generation_requests_per_minute / 60, settings.generation_burst
+        ),
+        max_attempts=settings.generation_max_attempts,
+        retry_base_seconds=settings.generation_retry_base_seconds,
+        retry_max_seconds=settings.generation_retry_max_seconds,
+        max_pending=settings.generation_max_pending_jobs,
+        lease_seconds=settings.generation_job_lease_seconds,
+        retention_seconds=settings.generation_job_retention_seconds,
+        poll_seconds=settings.generation_job_poll_seconds,
+    )
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Protocol
+
+import httpx
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+
+from app.clients import clients
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
+# Used when the key response has no Cache-Control max-age
+DEFAULT_KEYS_MAX_AGE = 3600
+
+# Minimum seconds between refreshes triggered by an unknown key ID, so tokens
+# with made-up key IDs can't make us hammer Google's certs endpoint
+MIN_FORCED_REFRESH_INTERVAL = 60
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class KeySource(Protocol):
+    """Fetches Google's public signing keys.
+
+    Returns the JWK set and how many seconds it may be cached for (None if the
+    source gives no hint). Tests can pass a stub that serves local keys.
+    """
+
+    async def fetch(self) -> tuple[dict, int | None]: ...
+
+
+class HttpKeySource:
+    """Fetches the JWK set from Google over HTTPS.
+
+    Uses the given client, else the app's shared HTTP client once it is open.
+    """
+
+    def __init__(
+        self, url: str = GOOGLE_CERTS_URL, client: httpx.AsyncClient | None = None
+    ):
+        self.url = url
+        self.client = client
+
+    async def fetch(self) -> tuple[dict, int | None]:
+        client = self.client or clients.http
+        if client:
+            response = await client.get(self.url)
+        else:
+            async with httpx.AsyncClient() as temp_client:
+                response = await temp_client.get(self.url)
+        response.raise_for_status()
+
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else None
+        return response.json(), max_age
+
+
+class StaticKeySource:
+    """Serves a fixed JWK set. Intended for tests and offline development."""
+
+    def __init__(self, jwks: dict, max_age: int | None = None):
+        self.jwks = jwks
+        self.max_age = max_age
+
+    async def fetch(self) -> tuple[dict, int | None]:
+        return self.jwks, self.max_age
+
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens locally against a cached copy of Google's keys.
+
+    Keys are refreshed when their Cache-Control max-age runs out, or early when a
+    token names a key ID we haven't seen (Google rotated its keys).
+    """
+
+    def __init__(self, key_source: KeySource):
+        self.key_source = key_source
+        self._keys: dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._refreshed_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    @staticmethod
+    def _unavailable() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google sign-in is temporarily unavailable",
+        )
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            # Another request may have refreshed, or failed to, while we waited
+            # for the lock
+            if time.monotonic() < self._expires_at:
+                if not self._keys:
+                    raise self._unavailable()
+                return
+            try:
+                jwks, max_age = await self.key_source.fetch()
+            except Exception as e:
+                logger.warning("Could not refresh Google signing keys: %s", e)
+                # Don't try again for a while, so an outage doesn't make every
+                # login queue up behind another fetch that times out
+                now = time.monotonic()
+                self._expires_at = now + MIN_FORCED_REFRESH_INTERVAL
+                self._refreshed_at = now
+                if not self._keys:
+                    raise self._unavailable()
+                # Keep serving the stale keys rather than failing every login
+                return
+            now = time.monotonic()
+            self._keys = {key["kid"]: key for key in jwks.get("keys", [])}
+            self._expires_at = now + (
+                max_age if max_age is not None else DEFAULT_KEYS_MAX_AGE
+            )
+            self._refreshed_at = now
+            self.refreshes += 1
+
+    async def _get_key(self, kid: str) -> dict | None:
+        if not self._keys or time.monotonic() >= self._expires_at:
+            await self._refresh()
+        if (
+            kid not in self._keys
+            and time.monotonic() - self._refreshed_at >= MIN_FORCED_REFRESH_INTERVAL
+        ):
+            # Unknown key ID: force one refresh in case Google rotated keys
+            self._expires_at = 0.0
+            await self._refresh()
+        return self._keys.get(kid)
+
+    async def verify(self, credential: str, client_id: str) -> dict | None:
+        """Return the verified token claims, or None if the token is invalid."""
+        try:
+            kid = jwt.get_unverified_header(credential).get("kid")
+        except JWTError:
+            return None
+        if not kid:
+            return None
+
+        key = await self._get_key(kid)
+        if key is None:
+            return None
+
+        try:
+            return jwt.decode(
+                credential,
+                key,
+                algorithms=["RS256"],
+                audience=client_id,
+                issuer=GOOGLE_ISSUERS,
+                options={"verify_at_hash": False},
+            )
+        except JWTError:
+            return None
+
+
+@lru_cache
+def get_google_verifier() -> GoogleTokenVerifier:
+    """Return the process-wide Google ID token verifier."""
+    return GoogleTokenVerifier(HttpKeySource())
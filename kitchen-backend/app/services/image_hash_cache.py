@@ -0,0 +1,146 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from PIL import Image
+from pymongo.errors import PyMongoError
+
+from app.config import get_settings
+from app.database import get_database
+from app.services.storage_service import InvalidImageError, open_image
+
+logger = logging.getLogger(__name__)
+
+# dHash compares neighbouring pixels of a HASH_WIDTH x HASH_HEIGHT thumbnail,
+# giving one bit per comparison: 8 rows x 8 comparisons = 64 bits
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# The hash is split into this many bands, each stored for exact-match lookup.
+# Two hashes at Hamming distance d differ in at most d bands, so with 4 bands
+# any match within distance 3 shares at least one band with the query.
+HASH_BANDS = 4
+BAND_BITS = 64 // HASH_BANDS
+
+
+def image_dhash(image_data: bytes) -> int:
+    """Return a 64-bit difference hash that survives resizing and recompression.
+
+    JPEGs are decoded in draft mode at 1/8 scale, so this stays cheap for
+    large photos. Raises InvalidImageError if the file can't be decoded.
+    """
+    image = open_image(image_data)
+    try:
+        image.draft("L", (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+        image = image.convert("L").resize((HASH_WIDTH, HASH_HEIGHT), Image.Resampling.BOX)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError("Image could not be decoded") from e
+    pixels = list(image.getdata())
+
+    value = 0
+    for row in range(HASH_HEIGHT):
+        for col in range(HASH_WIDTH - 1):
+            left = pixels[row * HASH_WIDTH + col]
+            right = pixels[row * HASH_WIDTH + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hash_bands(value: int) -> list[str]:
+    """Split a hash into tagged bands, e.g. "2:9f3a", for the multikey index."""
+    mask = (1 << BAND_BITS) - 1
+    return [
+        f"{i}:{(value >> (i * BAND_BITS)) & mask:0{BAND_BITS // 4}x}"
+        for i in range(HASH_BANDS)
+    ]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class ImageResultCache:
+    """Results extracted from images, found again by perceptual hash.
+
+    A re-submitted photo, or a resized or recompressed copy of it, hashes to
+    within a few bits of the original. Candidates sharing a hash band are
+    fetched through the index, and the closest one within max_distance wins.
+    Entries expire after ttl_seconds through the TTL index in app.indexes.
+    """
+
+    def __init__(self, collection_name: str, max_distance: int, ttl_seconds: float):
+        if max_distance >= HASH_BANDS:
+            logger.warning(
+                "Image cache distance %d may miss matches; only %d is guaranteed",
+                max_distance,
+                HASH_BANDS - 1,
+            )
+        self.collection_name = collection_name
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return get_database()[self.collection_name]
+
+    async def find(self, phash: int, prompt_key: str) -> dict | None:
+        """Return the stored result closest to phash, or None if none is near enough."""
+        best = None
+        best_distance = self.max_distance + 1
+        try:
+            cursor = self.collection.find(
+                {"bands": {"$in": hash_bands(phash)}, "prompt_key": prompt_key},
+                {"phash": 1, "value": 1},
+            )
+            async for doc in cursor:
+                distance = hamming_distance(phash, int(doc["phash"], 16))
+                if distance < best_distance:
+                    best, best_distance = doc, distance
+        except PyMongoError as e:
+            # A cache outage shouldn't fail extraction; fall through to OpenAI
+            logger.warning("Image cache lookup failed: %s", e)
+            best = None
+
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info("Image cache hit at Hamming distance %d", best_distance)
+        return best["value"]
+
+    async def add(self, phash: int, prompt_key: str, value: dict) -> None:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one(
+                {
+                    "phash": f"{phash:016x}",
+                    "bands": hash_bands(phash),
+                    "prompt_key": prompt_key,
+                    "value": value,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                }
+            )
+        except PyMongoError as e:
+            logger.warning("Image cache write failed: %s", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "max_distance": self.max_distance,
+        }
+
+
+@lru_cache
+def get_image_result_cache() -> ImageResultCache:
+    """Return the process-wide image result cache."""
+    settings = get_settings()
+    return ImageResultCache(
+        "image_extractions", settings.image_cache_max_distance, settings.image_cache_ttl_seconds
+    )
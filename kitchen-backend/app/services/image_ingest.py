@@ -0,0 +1,263 @@
+import io
+import json
+import logging
+import statistics
+import time
+from collections import deque
+from functools import lru_cache
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageFile, UnidentifiedImageError
+from pydantic import BaseModel
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the spooled upload per await
+CHUNK_SIZE = 64 * 1024
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+BODY_TOO_LARGE = "Request body is too large"
+
+# Starlette renamed the 413 constant between versions, so spell it out
+HTTP_413_CONTENT_TOO_LARGE = 413
+
+# Number of recent transfer rates kept for the metrics
+THROUGHPUT_WINDOW = 200
+
+# Raised by Pillow for images far over its pixel limit; the warning only when
+# warnings are turned into errors
+DECOMPRESSION_BOMB_ERRORS = (Image.DecompressionBombError, Image.DecompressionBombWarning)
+
+# Leading bytes -> content type. RIFF/WEBP needs bytes 8-12 too, see sniff_image_type
+MAGIC_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """Return the content type the file's magic bytes announce, or None if unsupported."""
+    for signature, content_type in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class IngestedImage(BaseModel):
+    """An upload read into memory after passing the size, format and pixel checks."""
+
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+
+
+class ImageIngestor:
+    """Reads image uploads in chunks and rejects bad ones as early as possible.
+
+    The format comes from the file's magic bytes, not the client's
+    content_type. Reading stops at max_bytes, and the pixel count is checked
+    as soon as the header has been seen, so an oversized file is never fully
+    loaded into memory.
+    """
+
+    def __init__(self, max_bytes: int, max_pixels: int):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.accepted = 0
+        self.rejected = 0
+        self.bytes_received = 0
+        self.throughput: deque[float] = deque(maxlen=THROUGHPUT_WINDOW)
+
+    def _reject(self, status_code: int, detail: str) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(status_code=status_code, detail=detail)
+
+    def _too_large(self) -> HTTPException:
+        return self._reject(
+            HTTP_413_CONTENT_TOO_LARGE,
+            f"Image must be at most {self.max_bytes // 1_000_000} MB",
+        )
+
+    def _too_many_pixels(self) -> HTTPException:
+        return self._reject(HTTP_413_CONTENT_TOO_LARGE, "Image has too many pixels")
+
+    def _check_pixels(self, width: int, height: int) -> None:
+        if width * height > self.max_pixels:
+            raise self._reject(
+                HTTP_413_CONTENT_TOO_LARGE,
+                f"Image is too large ({width}x{height} pixels)",
+            )
+
+    async def read(self, upload: UploadFile) -> IngestedImage:
+        """Read an uploaded image, enforcing the byte, format and pixel limits.
+
+        Raises HTTPException 400 if the file isn't a supported image and 413
+        if it is over the byte or pixel limit.
+        """
+        if upload.size is not None and upload.size > self.max_bytes:
+            raise self._too_large()
+
+        head = await upload.read(CHUNK_SIZE)
+        content_type = sniff_image_type(head)
+        if content_type is None:
+            raise self._reject(status.HTTP_400_BAD_REQUEST, "File must be an image")
+
+        # Feed chunks to an incremental parser only until it knows the size
+        parser = ImageFile.Parser()
+        size = None
+        chunks = []
+        received = 0
+        chunk = head
+        while chunk:
+            received += len(chunk)
+            if received > self.max_bytes:
+                raise self._too_large()
+            chunks.append(chunk)
+            if size is None:
+                try:
+                    parser.feed(chunk)
+                except DECOMPRESSION_BOMB_ERRORS:
+                    # Pillow's own pixel limit, hit before the header was complete
+                    raise self._too_many_pixels()
+                except (OSError, SyntaxError):
+                    raise self._reject(status.HTTP_400_BAD_REQUEST, "File must be an image")
+                if parser.image is not None:
+                    size = parser.image.size
+                    self._check_pixels(*size)
+            chunk = await upload.read(CHUNK_SIZE)
+
+        data = b"".join(chunks)
+        if size is None:
+            # Some formats (e.g. WebP) only parse once the whole file is there
+            try:
+                size = Image.open(io.BytesIO(data)).size
+            except DECOMPRESSION_BOMB_ERRORS:
+                raise self._too_many_pixels()
+            except (UnidentifiedImageError, OSError):
+                raise self._reject(status.HTTP_400_BAD_REQUEST, "File must be an image")
+            self._check_pixels(*size)
+
+        self.accepted += 1
+        return IngestedImage(
+            data=data, content_type=content_type, width=size[0], height=size[1]
+        )
+
+    def record_transfer(self, path: str, received: int, seconds: float) -> None:
+        """Log how fast a request body arrived. Called by UploadLimitMiddleware."""
+        rate = received / seconds if seconds > 0 else 0.0
+        self.bytes_received += received
+        self.throughput.append(rate)
+        logger.info(
+            "Received %d bytes for %s in %.0f ms (%.2f MB/s)",
+            received,
+            path,
+            seconds * 1000,
+            rate / 1e6,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "bytes_received": self.bytes_received,
+            "mb_per_second_p50": (
+                round(statistics.median(self.throughput) / 1e6, 2) if self.throughput else None
+            ),
+        }
+
+
+class UploadLimitMiddleware:
+    """Caps multipart request bodies before FastAPI buffers them.
+
+    FastAPI parses the whole form before a route runs, so the route-level
+    limit alone can't stop a huge upload from being received. This rejects
+    an oversized Content-Length up front, cuts off a body that streams past
+    the limit, and reports the transfer rate of every upload.
+    """
+
+    def __init__(self, app: ASGIApp, ingestor: ImageIngestor):
+        self.app = app
+        self.ingestor = ingestor
+        self.max_bytes = ingestor.max_bytes + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            self.ingestor.rejected += 1
+            await self._send_too_large(send)
+            return
+
+        received = 0
+        started_at = None
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, started_at
+            message = await receive()
+            if message["type"] == "http.request":
+                if started_at is None:
+                    started_at = time.perf_counter()
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    self.ingestor.rejected += 1
+                    raise HTTPException(
+                        status_code=HTTP_413_CONTENT_TOO_LARGE,
+                        detail=BODY_TOO_LARGE,
+                    )
+                if not message.get("more_body", False):
+                    self.ingestor.record_transfer(
+                        scope["path"], received, time.perf_counter() - started_at
+                    )
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            # Only reached if the body was read outside a route
+            if e.status_code != HTTP_413_CONTENT_TOO_LARGE or response_started:
+                raise
+            await self._send_too_large(send)
+
+    @staticmethod
+    async def _send_too_large(send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": HTTP_413_CONTENT_TOO_LARGE,
+                "headers": [(b"content-type", b"application/json"), (b"connection", b"close")],
+            }
+        )
+        body = json.dumps({"detail": BODY_TOO_LARGE}).encode()
+        await send({"type": "http.response.body", "body": body})
+
+
+@lru_cache
+def get_image_ingestor() -> ImageIngestor:
+    """Return the process-wide image upload reader."""
+    settings = get_settings()
+    return ImageIngestor(settings.max_upload_bytes, settings.max_upload_pixels)
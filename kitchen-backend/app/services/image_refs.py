@@ -0,0 +1,161 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel
+from pymongo import ReturnDocument, UpdateOne
+
+from app.models.recipe import ImageVariant, StoredImage
+
+# A delete claimed longer ago than this is assumed to have died with its process
+DELETE_CLAIM_SECONDS = 60
+
+# How often acquire checks whether a pending delete has finished
+DELETE_POLL_SECONDS = 0.1
+
+
+class ImageDeletion(BaseModel):
+    """The objects to delete after the last reference to an image was released.
+
+    Pass it to ImageRefs.finish_delete once the objects are gone.
+    """
+
+    url: str
+    variants: list[ImageVariant]
+    claim: str
+
+
+class ImageRefs:
+    """Reference counts for content-addressed images.
+
+    Identical uploads share one set of objects, so an image may only be
+    deleted once no recipe points at it. One document per stored image, keyed
+    by its URL, holds the count and every variant ever stored under it.
+
+    The document outlives its last reference until the objects are deleted,
+    marked with a delete claim. An upload of the same image in that window
+    waits for the delete to finish before writing, so the delete can't remove
+    objects a new recipe points at.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.image_refs
+
+    async def acquire(self, image: StoredImage) -> int:
+        """Add a reference to an image, returning the new count.
+
+        A count of 1 means the objects may be missing or half deleted and
+        should all be written.
+        """
+        doc = await self.collection.find_one_and_update(
+            {"_id": image.url},
+            {
+                "$inc": {"refs": 1},
+                "$addToSet": {
+                    "variants": {"$each": [v.model_dump() for v in image.variants]}
+                },
+                "$setOnInsert": {"created_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc.get("delete_claim"):
+            await self._wait_for_delete(image.url, doc["delete_claim"])
+        return doc["refs"]
+
+    async def _wait_for_delete(self, image_url: str, claim: str) -> None:
+        """Wait until a pending delete of an image's objects has finished or gone stale."""
+        while True:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=DELETE_CLAIM_SECONDS)
+            pending = await self.collection.find_one(
+                {"_id": image_url, "delete_claim": claim, "delete_claimed_at": {"$gt": cutoff}},
+                {"_id": 1},
+            )
+            if pending is None:
+                return
+            await asyncio.sleep(DELETE_POLL_SECONDS)
+
+    async def counted(self, image_urls: set[str]) -> set[str]:
+        """Return which of the URLs are live counted images, safe to share."""
+        if not image_urls:
+            return set()
+        cursor = self.collection.find(
+            {
+                "_id": {"$in": list(image_urls)},
+                "refs": {"$gt": 0},
+                "delete_claim": {"$exists": False},
+            },
+            {"_id": 1},
+        )
+        return {doc["_id"] async for doc in cursor}
+
+    async def share(self, counts: dict[str, int]) -> None:
+        """Add references to images that are already counted, e.g. for imported copies.
+
+        Only live documents are incremented: URLs without one (other hosts,
+        or images stored before reference counting) and images whose last
+        reference is already gone are left alone.
+        """
+        if not counts:
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne({"_id": url, "refs": {"$gt": 0}}, {"$inc": {"refs": n}})
+                for url, n in counts.items()
+            ],
+            ordered=False,
+        )
+
+    async def release(self, image_url: str) -> ImageDeletion | None:
+        """Drop a reference to an image.
+
+        Returns what to delete if that was the last reference, else None. The
+        caller deletes the objects and then calls finish_delete. Images
+        stored before reference counting have no document; since nothing
+        says how many recipes share them, they are never deleted.
+        """
+        doc = await self.collection.find_one_and_update(
+            {"_id": image_url},
+            {"$inc": {"refs": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None or doc["refs"] > 0:
+            return None
+
+        # Only the caller that claims the delete removes the objects. The claim
+        # fails if the image was acquired again since the decrement.
+        now = datetime.now(timezone.utc)
+        claim = uuid.uuid4().hex
+        claimed = await self.collection.find_one_and_update(
+            {
+                "_id": image_url,
+                "refs": {"$lte": 0},
+                "$or": [
+                    {"delete_claim": {"$exists": False}},
+                    {"delete_claimed_at": {"$lte": now - timedelta(seconds=DELETE_CLAIM_SECONDS)}},
+                ],
+            },
+            {"$set": {"delete_claim": claim, "delete_claimed_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if claimed is None:
+            return None
+        variants = [ImageVariant(**v) for v in claimed.get("variants", [])]
+        return ImageDeletion(url=image_url, variants=variants, claim=claim)
+
+    async def finish_delete(self, deletion: ImageDeletion) -> None:
+        """Record that a released image's objects are gone.
+
+        The document is removed if nobody acquired the image meanwhile;
+        otherwise only the claim is cleared, and the new owner, which waited
+        for it, writes the objects again.
+        """
+        result = await self.collection.delete_one(
+            {"_id": deletion.url, "delete_claim": deletion.claim, "refs": {"$lte": 0}}
+        )
+        if result.deleted_count == 0:
+            await self.collection.update_one(
+                {"_id": deletion.url, "delete_claim": deletion.claim},
+                {"$unset": {"delete_claim": "", "delete_claimed_at": ""}},
+            )
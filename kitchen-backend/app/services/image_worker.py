@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.database import get_database
+from app.services.image_refs import ImageRefs
+from app.services.recipe_service import RecipeService
+from app.services.storage_service import InvalidImageError, get_storage_service
+
+logger = logging.getLogger(__name__)
+
+# Originals are swept this long after their upload URL expired, so a client
+# that PUT just before expiry still has time to finalize
+UPLOAD_SWEEP_GRACE_SECONDS = 3600
+
+
+class ImageJob(BaseModel):
+    """A directly uploaded original waiting to be compressed for a recipe."""
+
+    recipe_id: str
+    object_name: str
+
+
+class ImageWorker:
+    """Compresses directly uploaded images after finalize has returned.
+
+    Finalize points the recipe at the original object, so it has an image
+    straight away; a worker then renders the usual variants and swaps them in
+    if the recipe still shows that original. Jobs live in memory, so a restart
+    drops pending ones and those recipes keep serving their original.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue[ImageJob] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"image-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: ImageJob) -> None:
+        self.queue.put_nowait(job)
+
+    async def _run(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.process(job)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Could not process image %s", job.object_name)
+            finally:
+                self.queue.task_done()
+
+    async def process(self, job: ImageJob) -> None:
+        storage = get_storage_service()
+        db = get_database()
+        refs = ImageRefs(db)
+        service = RecipeService(db)
+        original_url = storage.url_for(job.object_name)
+
+        try:
+            stored = await storage.process_upload(job.object_name, refs)
+        except InvalidImageError as e:
+            logger.warning("Dropping invalid upload %s: %s", job.object_name, e)
+            stored = None
+
+        updated = await service.swap_image(job.recipe_id, original_url, stored)
+        if updated is None and stored is not None:
+            # The recipe was deleted or given another image while we worked
+            await storage.delete_image(stored.url, refs, stored.variants)
+        await storage.delete_upload(job.object_name)
+
+    def stats(self) -> dict:
+        return {
+            "running": bool(self._tasks),
+            "queued": self.queue.qsize(),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+class UploadSweeper:
+    """Deletes directly uploaded originals that were never finalized.
+
+    A signed upload URL lets a client store an original under uploads/ and
+    never call finalize. Every `interval` seconds, originals older than
+    `min_age` are deleted, except those a recipe still shows because its
+    background job was lost: that recipe has nothing else to show.
+    """
+
+    def __init__(self, interval: float, min_age: float):
+        self.interval = interval
+        self.min_age = min_age
+        self._task: asyncio.Task | None = None
+        self.swept = 0
+        self.kept = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="upload-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Could not sweep abandoned uploads")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        """Delete abandoned originals once, returning how many were deleted."""
+        storage = get_storage_service()
+        if not storage.is_configured():
+            return 0
+        names = await storage.stale_uploads(self.min_age)
+        if not names:
+            return 0
+
+        # Upload names are uploads/<recipe_id>/<hex>, so only those recipes can show them
+        urls = {storage.url_for(name): name for name in names}
+        recipe_ids = list({name.split("/")[1] for name in names})
+        in_use = await RecipeService(get_database()).images_in_use(recipe_ids, list(urls))
+
+        deleted = 0
+        for url, name in urls.items():
+            if url not in in_use and await storage.delete_upload(name):
+                deleted += 1
+        self.swept += deleted
+        self.kept += len(in_use)
+        if deleted:
+            logger.info("Deleted %d abandoned uploads", deleted)
+        return deleted
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None, "swept": self.swept, "kept": self.kept}
+
+
+@lru_cache
+def get_image_worker() -> ImageWorker:
+    """Return the process-wide image worker."""
+    return ImageWorker(get_settings().image_worker_concurrency)
+
+
+@lru_cache
+def get_upload_sweeper() -> UploadSweeper:
+    """Return the process-wide sweeper for abandoned direct uploads."""
+    settings = get_settings()
+    return UploadSweeper(
+        settings.upload_sweep_interval_seconds,
+        settings.direct_upload_expire_seconds + UPLOAD_SWEEP_GRACE_SECONDS,
+    )
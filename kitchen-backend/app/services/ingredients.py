@@ -0,0 +1,201 @@
+"""Normalize free-text ingredient lines into comparable ingredient names.
+
+"2 cups finely chopped tomatoes (about 3)" and "Tomato, diced" both become
+"tomato". Recipes store the result as `ingredient_tokens`, which the pantry
+query matches against. Run this module directly to fill in tokens for recipes
+saved before normalization (or before a change to the rules):
+
+    python -m app.services.ingredients --backfill
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Stored with the tokens. Bump when the rules below change so the backfill
+# re-normalizes existing recipes.
+INGREDIENT_TOKENS_VERSION = 1
+
+BACKFILL_BATCH_SIZE = 1000
+
+UNITS = {
+    "c", "cup", "cups", "tbsp", "tbs", "tbsps", "tablespoon", "tablespoons", "tsp",
+    "tsps", "teaspoon", "teaspoons", "g", "gram", "grams", "kg", "kilogram",
+    "kilograms", "mg", "oz", "ounce", "ounces", "lb", "lbs", "pound", "pounds", "ml",
+    "milliliter", "milliliters", "millilitre", "millilitres", "l", "liter", "liters",
+    "litre", "litres", "dl", "cl", "pint", "pints", "quart", "quarts", "qt", "gallon",
+    "gallons", "pinch", "pinches", "dash", "dashes", "clove", "cloves", "can", "cans",
+    "tin", "tins", "jar", "jars", "package", "packages", "pkg", "packet", "packets",
+    "bunch", "bunches", "handful", "handfuls", "slice", "slices", "stick", "sticks",
+    "sprig", "sprigs", "piece", "pieces", "head", "heads", "stalk", "stalks", "bag",
+    "bags", "box", "boxes", "bottle", "bottles", "drop", "drops", "leaf", "leaves", "loaf",
+    "loaves",
+}
+
+DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "minced", "sliced", "thinly", "finely",
+    "roughly", "coarsely", "grated", "shredded", "peeled", "seeded", "crushed", "ground",
+    "large", "small", "medium", "big", "whole", "boneless", "skinless", "raw", "cooked",
+    "dried", "frozen", "canned", "softened", "melted", "room", "temperature", "packed",
+    "heaping", "level", "optional", "extra", "virgin", "extra-virgin", "unsalted",
+    "salted", "ripe", "organic", "beaten", "halved", "quartered", "cubed", "trimmed",
+    "rinsed", "drained", "divided", "toasted", "lightly", "about", "approximately",
+    "approx", "plus", "more", "of", "a", "an", "the", "some", "few", "into",
+}
+
+# Units that name the ingredient when nothing else does, as in "1 tsp ground cloves"
+UNIT_INGREDIENTS = {"clove", "cloves", "leaf", "leaves"}
+
+# Plurals the suffix rules below would get wrong
+IRREGULAR_SINGULARS = {"leaves": "leaf", "loaves": "loaf", "halves": "half"}
+INVARIANT_WORDS = {"molasses", "hummus", "couscous", "asparagus", "swiss", "citrus", "grits"}
+
+# Regional and marketing names folded to one canonical name, after singularizing
+SYNONYMS = {
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "coriander": "cilantro",
+    "garbanzo": "chickpea",
+    "garbanzo bean": "chickpea",
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "capsicum": "bell pepper",
+    "prawn": "shrimp",
+    "bay": "bay leaf",
+    "kosher salt": "salt",
+    "sea salt": "salt",
+    "table salt": "salt",
+    "granulated sugar": "sugar",
+    "white sugar": "sugar",
+    "caster sugar": "sugar",
+    "all-purpose flour": "flour",
+    "all purpose flour": "flour",
+    "plain flour": "flour",
+    "icing sugar": "powdered sugar",
+    "confectioners sugar": "powdered sugar",
+    "confectioner's sugar": "powdered sugar",
+    "bicarbonate soda": "baking soda",
+    "minced meat": "ground meat",
+    "parmesan cheese": "parmesan",
+    "cheddar cheese": "cheddar",
+}
+
+_PARENTHETICAL_RE = re.compile(r"\([^)]*\)")
+# Preparation notes and serving hints after the name
+_TRAILING_NOTE_RE = re.compile(
+    r",.*$|\b(?:to taste|for (?:garnish|serving|frying)|as needed)\b.*$"
+)
+_WORD_RE = re.compile(r"[a-z][a-z'-]*")
+
+
+def singularize(word: str) -> str:
+    """Fold an English plural to its singular with a few suffix rules."""
+    if word in INVARIANT_WORDS:
+        return word
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _normalize_name(text: str) -> str | None:
+    words = _WORD_RE.findall(text)
+    kept = [w for w in words if w not in UNITS and w not in DESCRIPTORS]
+    if not kept:
+        kept = [w for w in words if w in UNIT_INGREDIENTS][-1:]
+        if not kept:
+            return None
+    kept[-1] = singularize(kept[-1])
+    name = " ".join(kept)
+    return SYNONYMS.get(name, name)
+
+
+def normalize_ingredient(line: str) -> list[str]:
+    """Return the normalized ingredient names in one free-text ingredient line.
+
+    Quantities, units, preparation notes and size words are dropped, the
+    last word is singularized and synonyms are folded. "salt and pepper"
+    names two ingredients; of "butter or margarine" only the first is kept.
+    """
+    text = _PARENTHETICAL_RE.sub(" ", line.casefold())
+    text = _TRAILING_NOTE_RE.sub("", text)
+    text = text.split(" or ")[0]
+    names = (_normalize_name(part) for part in text.split(" and "))
+    return [name for name in names if name]
+
+
+def ingredient_tokens(ingredients: list[str]) -> list[str]:
+    """Return the distinct normalized ingredient names of a recipe, in order."""
+    tokens: dict[str, None] = {}
+    for line in ingredients:
+        for name in normalize_ingredient(line):
+            tokens.setdefault(name, None)
+    return list(tokens)
+
+
+def ingredient_fields(ingredients: list[str]) -> dict:
+    """The derived fields stored with a recipe's ingredients."""
+    return {
+        "ingredient_tokens": ingredient_tokens(ingredients),
+        "ingredient_tokens_version": INGREDIENT_TOKENS_VERSION,
+    }
+
+
+async def backfill_ingredient_tokens(db: AsyncIOMotorDatabase) -> int:
+    """Store tokens for recipes normalized by an older version, or never. Returns the count."""
+    updated = 0
+    batch = []
+    cursor = db.recipes.find(
+        {"ingredient_tokens_version": {"$ne": INGREDIENT_TOKENS_VERSION}},
+        {"ingredients": 1},
+    ).batch_size(BACKFILL_BATCH_SIZE)
+    async for doc in cursor:
+        fields = ingredient_fields(doc.get("ingredients") or [])
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            await db.recipes.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.recipes.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    if updated:
+        logger.info("Backfilled ingredient tokens for %d recipes", updated)
+    return updated
+
+
+async def _main() -> int:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.effective_mongodb_uri)
+    try:
+        updated = await backfill_ingredient_tokens(client[settings.database_name])
+        print(f"Updated {updated} recipes")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage normalized ingredient tokens.")
+    parser.add_argument(
+        "--backfill", action="store_true", help="store tokens for recipes missing them"
+    )
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.error("pass --backfill")
+
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(asyncio.run(_main()))
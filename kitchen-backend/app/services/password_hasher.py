@@ -0,0 +1,96 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import get_settings
+
+# Number of recent hash/verify durations kept for the latency metrics
+LATENCY_WINDOW = 500
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so a small pool keeps the event loop responsive
+    while a login burst is being processed. At most `workers` operations run at
+    once and at most `queue_size` more wait for a worker; anything beyond that
+    is rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_size: int, rounds: int):
+        # bcrypt with auto-upgrade support
+        self.context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self.rejected = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._timed, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a plain-text password using bcrypt."""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a plain-text password against a bcrypt hash."""
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else None
+        return {
+            "workers": self.workers,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": max(0, self.pending - self.workers),
+            "rejected": self.rejected,
+            "latency_ms_p50": round(p50 * 1000, 1),
+            "latency_ms_p95": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_password_hasher() -> PasswordHasher:
+    """Return the process-wide password hasher."""
+    settings = get_settings()
+    return PasswordHasher(
+        workers=settings.password_hash_workers,
+        queue_size=settings.password_hash_queue_size,
+        rounds=settings.bcrypt_rounds,
+    )
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import re
+from functools import lru_cache
+
+from pymongo.errors import PyMongoError
+
+from app.config import get_settings
+from app.services.recipe_cache import MemoryCacheBackend, MongoCacheBackend
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt_text: str) -> str:
+    """Fold case, whitespace and trailing punctuation so trivially different prompts match."""
+    return _WHITESPACE_RE.sub(" ", prompt_text.casefold()).strip().rstrip(".!?")
+
+
+def prompt_cache_key(prompt_text: str, model: str, system_prompt_version: int) -> str:
+    normalized = normalize_prompt(prompt_text)
+    digest = hashlib.sha256(f"{model}\n{system_prompt_version}\n{normalized}".encode())
+    return f"prompt:{digest.hexdigest()}"
+
+
+class PromptCache:
+    """Two-tier cache of generated recipes keyed by normalized prompt.
+
+    Lookups try the in-process LRU first, then the persistent tier, and copy
+    persistent hits into memory. Keys include the model and system prompt
+    version, so changing either starts a fresh cache.
+    """
+
+    def __init__(
+        self,
+        memory: MemoryCacheBackend,
+        persistent: MongoCacheBackend | None,
+        ttl_seconds: float,
+    ):
+        self.memory = memory
+        self.persistent = persistent
+        self.ttl_seconds = ttl_seconds
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    async def get(self, key: str) -> dict | None:
+        value = await self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.persistent is not None:
+            try:
+                value = await self.persistent.get(key)
+            except PyMongoError as e:
+                # A cache outage shouldn't fail generation; fall through to OpenAI
+                logger.warning("Prompt cache lookup failed: %s", e)
+            if value is not None:
+                self.persistent_hits += 1
+                await self.memory.set(key, value, self.ttl_seconds)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        await self.memory.set(key, value, self.ttl_seconds)
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, value, self.ttl_seconds)
+            except PyMongoError as e:
+                logger.warning("Prompt cache write failed: %s", e)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": self.memory.size(),
+            "evictions": self.memory.evictions,
+        }
+
+
+@lru_cache
+def get_prompt_cache() -> PromptCache:
+    """Return the process-wide prompt cache."""
+    settings = get_settings()
+    return PromptCache(
+        MemoryCacheBackend(settings.prompt_cache_max_entries),
+        MongoCacheBackend("prompt_cache") if settings.prompt_cache_persistent else None,
+        settings.prompt_cache_ttl_seconds,
+    )
@@ -0,0 +1,216 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Protocol
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.database import get_database
+
+
+class CacheBackend(Protocol):
+    """Storage interface for the recipe cache.
+
+    Values are plain JSON-compatible dicts so a shared, out-of-process backend
+    (e.g. Redis) can implement this interface without custom serialization.
+
+    Each key also has a generation that invalidate() bumps. A reader takes
+    the generation before loading the value from the database and passes
+    it to fill(), which stores nothing if the key was invalidated meanwhile,
+    so a slow read can't put back a version a write has just replaced.
+    """
+
+    async def get(self, key: str) -> dict | None: ...
+
+    async def set(self, key: str, value: dict, ttl: float) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def generation(self, key: str) -> int: ...
+
+    async def fill(self, key: str, value: dict, ttl: float, generation: int) -> None: ...
+
+    async def invalidate(self, key: str, ttl: float) -> None: ...
+
+    def size(self) -> int | None: ...
+
+
+class MemoryCacheBackend:
+    """In-process cache with per-entry TTL and least-recently-used eviction."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.evictions = 0
+        # Generations come from one counter, so they only grow. Keys without
+        # one report the newest generation dropped to stay bounded, which
+        # fails any fill that started before the drop.
+        self._generations: OrderedDict[str, int] = OrderedDict()
+        self._last_generation = 0
+        self._dropped_generation = 0
+
+    async def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def generation(self, key: str) -> int:
+        return self._generations.get(key, self._dropped_generation)
+
+    async def fill(self, key: str, value: dict, ttl: float, generation: int) -> None:
+        if await self.generation(key) == generation:
+            await self.set(key, value, ttl)
+
+    async def invalidate(self, key: str, ttl: float) -> None:
+        self._entries.pop(key, None)
+        self._last_generation += 1
+        self._generations[key] = self._last_generation
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.max_entries:
+            _, self._dropped_generation = self._generations.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class MongoCacheBackend:
+    """Cache entries in a MongoDB collection, shared by every app process.
+
+    Expiry is enforced on read; the TTL index registered in app.indexes
+    removes expired documents in the background. An invalidated key keeps
+    its document, without a value, so its generation outlives any read that
+    could still be filling it.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        return get_database()[self.collection_name]
+
+    async def get(self, key: str) -> dict | None:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        return doc.get("value") if doc else None
+
+    async def set(self, key: str, value: dict, ttl: float) -> None:
+        await self.collection.update_one(
+            {"_id": key}, {"$set": self._entry(value, ttl)}, upsert=True
+        )
+
+    @staticmethod
+    def _entry(value: dict, ttl: float) -> dict:
+        return {"value": value, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)}
+
+    async def delete(self, key: str) -> None:
+        await self.collection.delete_one({"_id": key})
+
+    async def generation(self, key: str) -> int:
+        doc = await self.collection.find_one({"_id": key}, {"generation": 1})
+        return doc.get("generation", 0) if doc else 0
+
+    async def fill(self, key: str, value: dict, ttl: float, generation: int) -> None:
+        if generation:
+            query = {"_id": key, "generation": generation}
+        else:
+            query = {"_id": key, "generation": {"$exists": False}}
+        try:
+            await self.collection.update_one(
+                query, {"$set": self._entry(value, ttl)}, upsert=True
+            )
+        except DuplicateKeyError:
+            # The key was invalidated since its generation was read
+            pass
+
+    async def invalidate(self, key: str, ttl: float) -> None:
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$unset": {"value": ""},
+                "$inc": {"generation": 1},
+                "$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)},
+            },
+            upsert=True,
+        )
+
+    def size(self) -> int | None:
+        # Unknown without a query; the TTL index keeps the collection bounded
+        return None
+
+
+class RecipeCache:
+    """Read-through cache of single recipes keyed by recipe ID.
+
+    Stores the dict produced by recipe_dict_from_mongo and counts hits and
+    misses so the cache can be sized from /metrics. Writes only invalidate;
+    the next read fills the entry, guarded by the key's generation.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(recipe_id: str) -> str:
+        return f"recipe:{recipe_id}"
+
+    async def get(self, recipe_id: str) -> dict | None:
+        value = await self.backend.get(self._key(recipe_id))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def generation(self, recipe_id: str) -> int:
+        return await self.backend.generation(self._key(recipe_id))
+
+    async def fill(self, recipe_id: str, value: dict, generation: int) -> None:
+        await self.backend.fill(self._key(recipe_id), value, self.ttl_seconds, generation)
+
+    async def invalidate(self, recipe_id: str) -> None:
+        await self.backend.invalidate(self._key(recipe_id), self.ttl_seconds)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": self.backend.size(),
+            "evictions": getattr(self.backend, "evictions", None),
+        }
+
+
+@lru_cache
+def get_recipe_cache() -> RecipeCache:
+    """Return the process-wide recipe cache, on the backend picked by recipe_cache_backend."""
+    settings = get_settings()
+    if settings.recipe_cache_backend == "mongo":
+        backend: CacheBackend = MongoCacheBackend("recipe_cache")
+    else:
+        backend = MemoryCacheBackend(settings.recipe_cache_max_entries)
+    return RecipeCache(backend, settings.recipe_cache_ttl_seconds)
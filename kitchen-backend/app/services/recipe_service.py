@@ -1,104 +1,653 @@
-from motor.motor_asyncio import AsyncIOMotorDatabase
+import base64
+import binascii
+from collections import Counter
+from collections.abc import AsyncIterable
+from typing import NoReturn
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorCursor, AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 from bson.errors import InvalidId
 
-from app.models.recipe import RecipeCreate, RecipeResponse, RecipeUpdate, recipe_from_mongo
+from app.models.recipe import (
+    RecipeCreate,
+    RecipeImportError,
+    RecipeImportResult,
+    RecipeImportTruncated,
+    RecipePage,
+    RecipeResponse,
+    PantryMatch,
+    PantryMatchPage,
+    RecipeUpdate,
+    RecipeView,
+    StoredImage,
+    recipe_dict_from_mongo,
+    recipe_from_mongo,
+    recipe_summary_from_mongo,
+)
+from app.services.image_ingest import HTTP_413_CONTENT_TOO_LARGE
+from app.services.image_refs import ImageRefs
+from app.services.ingredients import ingredient_fields, ingredient_tokens
+from app.services.recipe_cache import RecipeCache, get_recipe_cache
+from app.services.storage_service import StorageService
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Documents per round trip when streaming a whole listing
+STREAM_BATCH_SIZE = 200
+
+# Projection for list views: skip the bulky text arrays, keep a count for the cards
+SUMMARY_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "is_public": 1,
+    "user_id": 1,
+    "image_url": 1,
+    "image_variants": 1,
+    "ingredient_count": {"$size": {"$ifNull": ["$ingredients", []]}},
+}
+
+
+# Recipes written per insert_many during a bulk import
+IMPORT_BATCH_SIZE = 1000
+
+# Failed lines reported back from a bulk import; the rest are only counted
+MAX_IMPORT_ERRORS = 100
+
+
+# Deepest result a ranked listing (search, pantry) can page to. Ranked results
+# are paged by offset, and each page re-scores every match, so deep pages only
+# get slower.
+MAX_RANKED_OFFSET = 500
+
+
+def encode_cursor(object_id: ObjectId) -> str:
+    """Encode the last _id of a page as an opaque cursor string."""
+    return base64.urlsafe_b64encode(object_id.binary).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    """Decode a cursor produced by encode_cursor.
+
+    Raises HTTPException(400) if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return ObjectId(raw)
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def validation_message(error: ValidationError) -> str:
+    """Summarize a ValidationError as "field: problem; ..." for per-line reports."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'recipe'}: {e['msg']}"
+        for e in error.errors(include_url=False)
+    )
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    """Decode a ranked listing's cursor, which is the offset of the next result.
+
+    Raises HTTPException(400) if the cursor is malformed or past MAX_RANKED_OFFSET.
+    """
+    if not cursor.isdigit() or int(cursor) > MAX_RANKED_OFFSET:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    return int(cursor)
 
 
 class RecipeService:
     """Service for recipe CRUD operations."""
 
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, cache: RecipeCache | None = None):
         self.collection = db["recipes"]
+        self.cache = cache or get_recipe_cache()
+
+    async def _invalidated(self, doc: dict) -> RecipeResponse:
+        """Drop the cached copy of a written recipe and return the document as a response.
+
+        Writes don't store the new version: two racing writes could leave the
+        older one cached. The next find_by_id fills the cache instead.
+        """
+        response = recipe_from_mongo(doc)
+        await self.cache.invalidate(response.id)
+        return response
+
+    async def _get_page(
+        self,
+        query: dict,
+        limit: int,
+        cursor: str | None,
+        view: RecipeView,
+    ) -> RecipePage:
+        """Fetch one page of recipes matching query, ordered by _id.
+
+        Uses keyset pagination: the cursor is the last _id of the previous page,
+        so every page is an index range scan regardless of how deep it is.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if cursor:
+            query = {**query, "_id": {"$gt": decode_cursor(cursor)}}
+
+        projection = SUMMARY_PROJECTION if view == "summary" else None
+        transform = recipe_summary_from_mongo if view == "summary" else recipe_from_mongo
+
+        # Fetch one extra document to know whether another page exists
+        docs = (
+            await self.collection.find(query, projection)
+            .sort("_id", 1)
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["_id"])
+
+        return RecipePage(items=[transform(doc) for doc in docs], next_cursor=next_cursor)
+
+    async def get_public(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        view: RecipeView = "full",
+    ) -> RecipePage:
+        """Get a page of public recipes from the database."""
+        return await self._get_page({"is_public": True}, limit, cursor, view)
+
+    async def get_by_user(
+        self,
+        user_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        view: RecipeView = "full",
+    ) -> RecipePage:
+        """Get a page of recipes owned by a specific user."""
+        return await self._get_page({"user_id": user_id}, limit, cursor, view)
+
+    @staticmethod
+    def _visible_to(user_id: str | None) -> dict:
+        """Filter for the recipes a caller may see: public ones and their own."""
+        if user_id:
+            return {"$or": [{"is_public": True}, {"user_id": user_id}]}
+        return {"is_public": True}
+
+    async def search(
+        self,
+        text: str,
+        user_id: str | None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        view: RecipeView = "full",
+    ) -> RecipePage:
+        """Get a page of recipes matching a text query, best match first.
+
+        Served by the weighted recipes text index (see app.indexes). Only
+        public recipes and the user's own are searched, as for find_by_id.
+        Ties are broken by _id so paging by offset is stable.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = decode_offset_cursor(cursor) if cursor else 0
+
+        query = {"$text": {"$search": text}, **self._visible_to(user_id)}
+
+        score = {"score": {"$meta": "textScore"}}
+        projection = {**SUMMARY_PROJECTION, **score} if view == "summary" else score
+        transform = recipe_summary_from_mongo if view == "summary" else recipe_from_mongo
+
+        docs = (
+            await self.collection.find(query, projection)
+            .sort([("score", {"$meta": "textScore"}), ("_id", 1)])
+            .skip(offset)
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+
+        next_cursor = None
+        if len(docs) > limit and offset + limit <= MAX_RANKED_OFFSET:
+            next_cursor = str(offset + limit)
+        return RecipePage(
+            items=[transform(doc) for doc in docs[:limit]], next_cursor=next_cursor
+        )
+
+    async def pantry_matches(
+        self,
+        pantry: list[str],
+        user_id: str | None,
+        min_coverage: float = 0.0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        view: RecipeView = "full",
+    ) -> PantryMatchPage:
+        """Get a page of recipes ranked by how many of their ingredients the pantry has.
+
+        Pantry items are normalized like recipe ingredients and matched by
+        exact name, so "chicken" doesn't cover "chicken broth". Coverage is
+        computed in the aggregation pipeline; only recipes sharing at least
+        one ingredient are read, through the ingredient_tokens index.
+        Raises HTTPException(400) if no pantry item is recognized.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = decode_offset_cursor(cursor) if cursor else 0
+        tokens = ingredient_tokens(pantry)
+        if not tokens:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No ingredients recognized",
+            )
+
+        pantry_set = {"$literal": tokens}
+        pipeline: list[dict] = [
+            {"$match": {"ingredient_tokens": {"$in": tokens}, **self._visible_to(user_id)}},
+            {
+                "$set": {
+                    "pantry_matched": {
+                        "$size": {"$setIntersection": ["$ingredient_tokens", pantry_set]}
+                    }
+                }
+            },
+            {
+                "$set": {
+                    "pantry_coverage": {
+                        "$divide": ["$pantry_matched", {"$size": "$ingredient_tokens"}]
+                    }
+                }
+            },
+            {"$match": {"pantry_coverage": {"$gte": min_coverage}}},
+            {"$sort": {"pantry_coverage": -1, "pantry_matched": -1, "_id": 1}},
+            {"$skip": offset},
+            {"$limit": limit + 1},
+            {
+                "$set": {
+                    "pantry_missing": {"$setDifference": ["$ingredient_tokens", pantry_set]}
+                }
+            },
+        ]
+        if view == "summary":
+            pipeline.append(
+                {
+                    "$project": {
+                        **SUMMARY_PROJECTION,
+                        "pantry_coverage": 1,
+                        "pantry_matched": 1,
+                        "pantry_missing": 1,
+                    }
+                }
+            )
+        transform = recipe_summary_from_mongo if view == "summary" else recipe_from_mongo
+
+        docs = await self.collection.aggregate(pipeline).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit and offset + limit <= MAX_RANKED_OFFSET:
+            next_cursor = str(offset + limit)
+        return PantryMatchPage(
+            items=[
+                PantryMatch(
+                    recipe=transform(doc),
+                    coverage=doc["pantry_coverage"],
+                    matched=doc["pantry_matched"],
+                    missing=doc["pantry_missing"],
+                )
+                for doc in docs[:limit]
+            ],
+            next_cursor=next_cursor,
+        )
+
+    def _stream(self, query: dict, view: RecipeView) -> AsyncIOMotorCursor:
+        """Return a cursor over every matching raw document, ordered by _id."""
+        projection = SUMMARY_PROJECTION if view == "summary" else None
+        return (
+            self.collection.find(query, projection)
+            .sort("_id", 1)
+            .batch_size(STREAM_BATCH_SIZE)
+        )
 
-    async def get_public(self) -> list[RecipeResponse]:
-        """Get all public recipes from the database."""
-        recipes = []
-        async for doc in self.collection.find({"is_public": True}):
-            recipes.append(recipe_from_mongo(doc))
-        return recipes
+    def stream_public(self, view: RecipeView = "full") -> AsyncIOMotorCursor:
+        """Get a cursor over all public recipes as raw MongoDB documents."""
+        return self._stream({"is_public": True}, view)
 
-    async def get_by_user(self, user_id: str) -> list[RecipeResponse]:
-        """Get all recipes owned by a specific user."""
-        recipes = []
-        async for doc in self.collection.find({"user_id": user_id}):
-            recipes.append(recipe_from_mongo(doc))
-        return recipes
+    def stream_by_user(self, user_id: str, view: RecipeView = "full") -> AsyncIOMotorCursor:
+        """Get a cursor over all of a user's recipes as raw MongoDB documents."""
+        return self._stream({"user_id": user_id}, view)
 
     async def find_by_id(self, recipe_id: str) -> RecipeResponse | None:
-        """Find a recipe by its ID. Returns None if not found or invalid ID."""
+        """Find a recipe by its ID. Returns None if not found or invalid ID.
+
+        Reads through the recipe cache; writes below invalidate it.
+        """
         try:
             object_id = ObjectId(recipe_id)
         except InvalidId:
             return None
 
+        cached = await self.cache.get(str(object_id))
+        if cached is not None:
+            return RecipeResponse(**cached)
+
+        # Taken before the read, so a write that lands in between bumps it
+        # and the stale document isn't cached
+        generation = await self.cache.generation(str(object_id))
         doc = await self.collection.find_one({"_id": object_id})
         if doc:
-            return recipe_from_mongo(doc)
+            data = recipe_dict_from_mongo(doc)
+            await self.cache.fill(data["id"], data, generation)
+            return RecipeResponse(**data)
         return None
 
-    async def add_recipe(self, recipe: RecipeCreate, user_id: str) -> RecipeResponse:
-        """Add a new recipe to the database."""
-        doc = recipe.model_dump()
-        doc["user_id"] = user_id
-        result = await self.collection.insert_one(doc)
+    @staticmethod
+    def _new_doc(recipe: RecipeCreate, user_id: str) -> dict:
+        """Build the document stored for a new recipe, with its ingredient tokens."""
+        return {
+            **recipe.model_dump(),
+            "user_id": user_id,
+            **ingredient_fields(recipe.ingredients),
+        }
+
+    async def _adopt_images(
+        self, docs: list[dict], user_id: str, refs: ImageRefs, storage: StorageService
+    ) -> set[str]:
+        """Vet the image URLs on new recipe documents before they are inserted.
 
-        created_doc = await self.collection.find_one({"_id": result.inserted_id})
-        return recipe_from_mongo(created_doc)
+        A URL into our storage is kept if the image is counted, so the copy
+        can take a reference, or if it is an uncounted image (stored before
+        reference counting, so never deleted) already on one of the user's
+        recipes. Any other URL of ours is cleared: it may be another user's
+        image, which deleting this recipe would release. Images on other
+        hosts are kept. Returns the counted URLs, for the caller to share
+        once the documents are in.
+        """
+        own = {
+            doc["image_url"]
+            for doc in docs
+            if doc.get("image_url") and storage.is_stored_url(doc["image_url"])
+        }
+        if not own:
+            return set()
+        counted = await refs.counted(own)
+        # Originals are deleted once processed, so a second recipe can't share one
+        uncounted = [url for url in own - counted if not storage.is_upload_url(url)]
+        owned = set()
+        if uncounted:
+            owned = set(
+                await self.collection.distinct(
+                    "image_url", {"user_id": user_id, "image_url": {"$in": uncounted}}
+                )
+            )
+        for doc in docs:
+            if doc.get("image_url") in own and doc["image_url"] not in counted | owned:
+                doc["image_url"] = None
+        return counted
+
+    async def add_recipe(
+        self,
+        recipe: RecipeCreate,
+        user_id: str,
+        refs: ImageRefs,
+        storage: StorageService,
+    ) -> RecipeResponse:
+        """Add a new recipe to the database.
+
+        An image_url into our storage is kept only as _adopt_images allows,
+        and a counted image gains a reference for the new recipe.
+        """
+        doc = self._new_doc(recipe, user_id)
+        counted = await self._adopt_images([doc], user_id, refs, storage)
+        # insert_one sets doc["_id"], so the stored document is already in hand
+        await self.collection.insert_one(doc)
+        if doc["image_url"] in counted:
+            await refs.share({doc["image_url"]: 1})
+        return recipe_from_mongo(doc)
+
+    async def add_recipes(
+        self, recipes: list[RecipeCreate], user_id: str
+    ) -> list[RecipeResponse]:
+        """Add several recipes in one insert_many round trip, in order."""
+        docs = [self._new_doc(recipe, user_id) for recipe in recipes]
+        if not docs:
+            return []
+        await self.collection.insert_many(docs)
+        return [recipe_from_mongo(doc) for doc in docs]
+
+    async def import_recipes(
+        self,
+        lines: AsyncIterable[tuple[int, bytes]],
+        user_id: str,
+        refs: ImageRefs,
+        storage: StorageService,
+    ) -> RecipeImportResult:
+        """Validate NDJSON lines against RecipeCreate and insert them in batches.
+
+        Invalid lines are skipped and reported by line number; blank lines
+        are ignored. Imported recipes aren't cached, since nobody has read
+        them yet. Copies of images we count get a reference each, so deleting
+        the original recipe doesn't delete the image from under them; other
+        images of ours are kept only as _adopt_images allows.
+
+        If lines raises 413 partway (the body went over the size limit), the
+        complete lines before it are still imported and the 413 is re-raised
+        with a RecipeImportTruncated detail saying how far the import got.
+        """
+        imported = 0
+        last_line = 0
+        failed = 0
+        errors: list[RecipeImportError] = []
+        batch: list[tuple[int, dict]] = []
+
+        def record(line_number: int, message: str) -> None:
+            nonlocal failed
+            failed += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append(RecipeImportError(line=line_number, error=message))
+
+        async def flush() -> None:
+            nonlocal imported
+            docs = [doc for _, doc in batch]
+            counted = await self._adopt_images(docs, user_id, refs, storage)
+            failed_indexes = set()
+            try:
+                await self.collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details["writeErrors"]:
+                    failed_indexes.add(write_error["index"])
+                    record(batch[write_error["index"]][0], write_error["errmsg"])
+            inserted = [doc for i, doc in enumerate(docs) if i not in failed_indexes]
+            imported += len(inserted)
+            await refs.share(
+                Counter(doc["image_url"] for doc in inserted if doc["image_url"] in counted)
+            )
+            batch.clear()
 
-    async def update_recipe(
-        self, recipe_id: str, recipe: RecipeUpdate
-    ) -> RecipeResponse | None:
-        """Update an existing recipe. Returns None if not found or invalid ID."""
         try:
-            object_id = ObjectId(recipe_id)
-        except InvalidId:
-            return None
+            async for line_number, line in lines:
+                last_line = line_number
+                if not line.strip():
+                    continue
+                try:
+                    recipe = RecipeCreate.model_validate_json(line)
+                except ValidationError as e:
+                    record(line_number, validation_message(e))
+                    continue
+                batch.append((line_number, self._new_doc(recipe, user_id)))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await flush()
+        except HTTPException as e:
+            if e.status_code != HTTP_413_CONTENT_TOO_LARGE:
+                raise
+            # Earlier batches are saved, so tell the client where the cut fell
+            if batch:
+                await flush()
+            truncated = RecipeImportTruncated(
+                imported=imported,
+                failed=failed,
+                errors=errors,
+                message=str(e.detail),
+                last_line=last_line,
+            )
+            raise HTTPException(status_code=e.status_code, detail=truncated.model_dump())
+        if batch:
+            await flush()
+
+        return RecipeImportResult(imported=imported, failed=failed, errors=errors)
 
-        update_data = {
+    @staticmethod
+    def _update_fields(recipe: RecipeUpdate) -> dict:
+        return {
             "title": recipe.title,
             "description": recipe.description,
             "ingredients": recipe.ingredients,
             "directions": recipe.directions,
             "is_public": recipe.is_public,
-            "image_url": recipe.image_url,
         }
 
-        result = await self.collection.find_one_and_update(
-            {"_id": object_id},
-            {"$set": update_data},
-            return_document=True,
-        )
+    @classmethod
+    def _update_pipeline(cls, recipe: RecipeUpdate) -> list[dict]:
+        """Build an update pipeline that sets the editable fields.
 
-        if result:
-            return recipe_from_mongo(result)
-        return None
+        The image isn't editable here; it belongs to the image routes.
+        Ingredient tokens are recomputed. Values are wrapped in $literal so
+        user text starting with "$" isn't read as a field path.
+        """
+        values = {**cls._update_fields(recipe), **ingredient_fields(recipe.ingredients)}
+        return [{"$set": {k: {"$literal": v} for k, v in values.items()}}]
+
+    @staticmethod
+    def _image_fields(image: StoredImage | None) -> dict:
+        return {
+            "image_url": image.url if image else None,
+            "image_variants": [v.model_dump() for v in image.variants] if image else [],
+        }
 
-    async def delete_by_id(self, recipe_id: str) -> bool:
-        """Delete a recipe by its ID. Returns True if deleted, False if not found."""
+    @staticmethod
+    def _owned_object_id(recipe_id: str) -> ObjectId:
+        """Parse a recipe ID for an ownership-checked write. Invalid IDs are a 404."""
         try:
-            object_id = ObjectId(recipe_id)
+            return ObjectId(recipe_id)
         except InvalidId:
-            return False
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Recipe not found",
+            )
+
+    async def _raise_not_owned(self, recipe_id: str) -> NoReturn:
+        """Explain why an ownership-filtered write matched nothing.
 
-        result = await self.collection.delete_one({"_id": object_id})
-        return result.deleted_count > 0
+        Only called after the single write operation missed, so the extra
+        lookup is off the happy path. Raises 403 if the recipe exists, else 404.
+        """
+        if await self.find_by_id(recipe_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't own this recipe",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found",
+        )
+
+    async def get_owned(self, recipe_id: str, user_id: str) -> RecipeResponse:
+        """Return a recipe if user_id owns it.
+
+        Raises HTTPException 404 if the recipe doesn't exist, 403 if not owned.
+        """
+        recipe = await self.find_by_id(recipe_id)
+        if recipe and recipe.user_id == user_id:
+            return recipe
+        await self._raise_not_owned(recipe_id)
 
-    async def update_image(
-        self, recipe_id: str, image_url: str | None
+    async def update_owned(
+        self, recipe_id: str, user_id: str, recipe: RecipeUpdate
+    ) -> RecipeResponse:
+        """Update a recipe only if user_id owns it, in one round trip.
+
+        Raises HTTPException 404 if the recipe doesn't exist, 403 if not owned.
+        """
+        object_id = self._owned_object_id(recipe_id)
+        result = await self.collection.find_one_and_update(
+            {"_id": object_id, "user_id": user_id},
+            self._update_pipeline(recipe),
+            return_document=ReturnDocument.AFTER,
+        )
+        if not result:
+            await self._raise_not_owned(recipe_id)
+        return await self._invalidated(result)
+
+    async def update_owned_image(
+        self, recipe_id: str, user_id: str, image: StoredImage | None
+    ) -> tuple[RecipeResponse, RecipeResponse]:
+        """Set a recipe's image and variants only if user_id owns it, in one round trip.
+
+        Returns the updated recipe and the recipe as it was before, so the
+        caller can delete the images it replaced.
+        Raises HTTPException 404 if the recipe doesn't exist, 403 if not owned.
+        """
+        object_id = self._owned_object_id(recipe_id)
+        image_fields = self._image_fields(image)
+        previous = await self.collection.find_one_and_update(
+            {"_id": object_id, "user_id": user_id},
+            {"$set": image_fields},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if not previous:
+            await self._raise_not_owned(recipe_id)
+        updated = await self._invalidated({**previous, **image_fields})
+        return updated, recipe_from_mongo(previous)
+
+    async def swap_image(
+        self, recipe_id: str, current_url: str, image: StoredImage | None
     ) -> RecipeResponse | None:
-        """Update a recipe's image URL. Returns None if not found or invalid ID."""
+        """Replace a recipe's image only if it still points at current_url.
+
+        Used when a processed image is ready, so it can't overwrite an image
+        the owner set in the meantime. Returns None if nothing was replaced.
+        """
         try:
             object_id = ObjectId(recipe_id)
         except InvalidId:
             return None
 
         result = await self.collection.find_one_and_update(
-            {"_id": object_id},
-            {"$set": {"image_url": image_url}},
-            return_document=True,
+            {"_id": object_id, "image_url": current_url},
+            {"$set": self._image_fields(image)},
+            return_document=ReturnDocument.AFTER,
         )
-
         if result:
-            return recipe_from_mongo(result)
+            return await self._invalidated(result)
         return None
+
+    async def images_in_use(self, recipe_ids: list[str], image_urls: list[str]) -> set[str]:
+        """Return which of image_urls the given recipes currently show."""
+        object_ids = [ObjectId(rid) for rid in recipe_ids if ObjectId.is_valid(rid)]
+        if not object_ids or not image_urls:
+            return set()
+        cursor = self.collection.find(
+            {"_id": {"$in": object_ids}, "image_url": {"$in": image_urls}},
+            {"image_url": 1},
+        )
+        return {doc["image_url"] async for doc in cursor}
+
+    async def delete_owned(self, recipe_id: str, user_id: str) -> RecipeResponse:
+        """Delete a recipe only if user_id owns it, in one round trip.
+
+        Returns the deleted recipe.
+        Raises HTTPException 404 if the recipe doesn't exist, 403 if not owned.
+        """
+        object_id = self._owned_object_id(recipe_id)
+        deleted = await self.collection.find_one_and_delete(
+            {"_id": object_id, "user_id": user_id}
+        )
+        if not deleted:
+            await self._raise_not_owned(recipe_id)
+        await self.cache.invalidate(str(object_id))
+        return recipe_from_mongo(deleted)
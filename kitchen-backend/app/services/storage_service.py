@@ -1,121 +1,745 @@
+import asyncio
+import hashlib
+import hmac
 import io
 import json
+import logging
+import multiprocessing
+import os
+import statistics
+import threading
+import time
 import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlencode
 
+from fastapi.staticfiles import StaticFiles
 from google.cloud import storage
 from google.oauth2 import service_account
-from PIL import Image
+from PIL import ExifTags, Image, UnidentifiedImageError, features
 
 from app.config import Settings, get_settings
+from app.models.recipe import ImageVariant, StoredImage
+from app.services.image_refs import ImageRefs
+
+logger = logging.getLogger(__name__)
 
 MAX_IMAGE_WIDTH = 1200
 JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
 
+# Format name -> (file extension, content type)
+IMAGE_FORMATS = {
+    "jpeg": ("jpg", "image/jpeg"),
+    "webp": ("webp", "image/webp"),
+    "avif": ("avif", "image/avif"),
+}
 
-class StorageService:
-    """Service for uploading files to Google Cloud Storage."""
+# Larger inputs are rejected from the header alone, before decoding
+MAX_IMAGE_PIXELS = 40_000_000
 
-    def __init__(self, settings: Settings | None = None):
-        self.settings = settings or get_settings()
-        self.client: storage.Client | None = None
-        self.bucket: storage.Bucket | None = None
+# EXIF orientation value -> transpose that makes the image upright
+EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
 
-        if not self.settings.gcs_bucket_name:
-            return
+# Number of recent durations kept per stage for the timing metrics
+TIMING_WINDOW = 200
 
-        credentials = None
+# Objects are named by a hash of their content, so a URL never changes meaning
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-        # Try JSON string first (for production/Fly.io)
-        if self.settings.gcs_credentials_json:
-            credentials_info = json.loads(self.settings.gcs_credentials_json)
-            credentials = service_account.Credentials.from_service_account_info(
-                credentials_info
-            )
-        # Fall back to file path (for local development)
-        elif self.settings.gcs_credentials_file:
-            credentials = service_account.Credentials.from_service_account_file(
-                self.settings.gcs_credentials_file
-            )
+# Originals uploaded straight to storage land here until they are processed
+UPLOAD_FOLDER = "uploads"
 
-        if credentials:
-            self.client = storage.Client(credentials=credentials)
-            self.bucket = self.client.bucket(self.settings.gcs_bucket_name)
+# Where LocalStorageService accepts signed uploads (see app.routes.uploads)
+LOCAL_UPLOAD_PATH = "/api/uploads"
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload can't be decoded or exceeds the pixel limit."""
 
-    def is_configured(self) -> bool:
-        """Check if GCS is properly configured."""
-        return self.bucket is not None
 
-    def _compress_image(self, image_data: bytes) -> tuple[bytes, str]:
-        """Compress and resize image, returning (compressed_data, content_type)."""
+def open_image(image_data: bytes) -> Image.Image:
+    """Open an image lazily and check its size before any pixels are decoded.
+
+    Image.open only parses the header, so the pixel-count check rejects
+    decompression bombs before the bitmap is allocated.
+    """
+    try:
         image = Image.open(io.BytesIO(image_data))
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise InvalidImageError("File is not a supported image") from e
+
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise InvalidImageError(
+            f"Image is too large ({image.width}x{image.height} pixels)"
+        )
+    return image
+
+
+def decode_image(
+    image_data: bytes,
+    max_width: int | None = None,
+    *,
+    max_long_edge: int | None = None,
+    max_short_edge: int | None = None,
+) -> Image.Image:
+    """Decode an upload into an upright RGB image within the given size limits.
+
+    JPEGs are decoded straight at the smallest 1/2, 1/4 or 1/8 scale that is
+    still at least the target size (draft mode), so a 12 MP photo never exists
+    at full resolution in memory. EXIF orientation is read from the header and
+    applied to the small image at the end. Raises InvalidImageError if the
+    file can't be decoded.
+    """
+    image = open_image(image_data)
+    # PNG reads its EXIF from the image data, so decoding can fail from here
+    # on even for a file that passed the header checks
+    try:
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+
+        # Orientations 5-8 rotate by 90 degrees, so the displayed width is the stored height
+        stored_width, stored_height = image.size
+        display_width = stored_height if orientation in (5, 6, 7, 8) else stored_width
+        scale = 1.0
+        if max_width:
+            scale = min(scale, max_width / display_width)
+        if max_long_edge:
+            scale = min(scale, max_long_edge / max(image.size))
+        if max_short_edge:
+            scale = min(scale, max_short_edge / min(image.size))
+        target_size = (
+            max(1, round(stored_width * scale)),
+            max(1, round(stored_height * scale)),
+        )
+
+        if image.format == "JPEG" and scale < 1.0:
+            image.draft("RGB", target_size)
+        image.load()
 
         # Convert to RGB if necessary (handles PNG with transparency, etc.)
         if image.mode in ("RGBA", "LA", "P"):
-            background = Image.new("RGB", image.size, (255, 255, 255))
-            if image.mode == "P":
+            if image.mode != "RGBA":
                 image = image.convert("RGBA")
-            background.paste(image, mask=image.split()[-1] if image.mode == "RGBA" else None)
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
             image = background
         elif image.mode != "RGB":
             image = image.convert("RGB")
 
-        # Resize if width exceeds maximum
-        if image.width > MAX_IMAGE_WIDTH:
-            ratio = MAX_IMAGE_WIDTH / image.width
-            new_height = int(image.height * ratio)
-            image = image.resize((MAX_IMAGE_WIDTH, new_height), Image.LANCZOS)
+        # Resize if over a limit; reducing_gap does a cheap box reduction first
+        if image.size != target_size:
+            image = image.resize(target_size, Image.LANCZOS, reducing_gap=3.0)
+
+        transpose = EXIF_TRANSPOSE.get(orientation)
+        if transpose is not None:
+            image = image.transpose(transpose)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError("Image could not be decoded") from e
+    return image
+
 
-        # Compress to JPEG
-        output = io.BytesIO()
+def encode_image(image: Image.Image, image_format: str) -> bytes:
+    """Encode an RGB image in one of IMAGE_FORMATS."""
+    output = io.BytesIO()
+    if image_format == "jpeg":
         image.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=True)
-        return output.getvalue(), "image/jpeg"
+    elif image_format == "webp":
+        image.save(output, format="WEBP", quality=WEBP_QUALITY, method=4)
+    elif image_format == "avif":
+        image.save(output, format="AVIF", quality=AVIF_QUALITY)
+    else:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    return output.getvalue()
+
+
+def prepare_vision_image(
+    image_data: bytes, max_long_edge: int, max_short_edge: int | None
+) -> tuple[bytes, tuple[int, int]]:
+    """Shrink an image to the size a vision model actually looks at.
+
+    Returns JPEG data and the new (width, height). Module-level so it can run
+    in the image worker process.
+    """
+    image = decode_image(
+        image_data, max_long_edge=max_long_edge, max_short_edge=max_short_edge
+    )
+    return encode_image(image, "jpeg"), image.size
+
+
+def render_variants(
+    image_data: bytes, widths: list[int], formats: list[str]
+) -> tuple[bytes, list[tuple[int, str, bytes]]]:
+    """Decode once and render every width/format variant.
+
+    Returns the JPEG fallback at the largest width plus (width, format, data)
+    for each variant. Widths larger than the source are collapsed to the
+    source width rather than upscaled. Each smaller width is resized from the
+    previous one, so only the first resize touches the full decode.
+
+    Module-level so it can run in the image worker process.
+    """
+    image = decode_image(image_data, max(widths))
+    fallback = encode_image(image, "jpeg")
+
+    variants = []
+    for width in sorted({min(w, image.width) for w in widths}, reverse=True):
+        if width < image.width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for image_format in formats:
+            variants.append((width, image_format, encode_image(image, image_format)))
+    return fallback, variants
+
+
+class StorageService:
+    """Base class for image storage backends.
+
+    Handles compression and URL bookkeeping; subclasses implement the blocking
+    _put/_exists/_delete primitives and set base_url, the public URL prefix of
+    stored objects.
+
+    Objects are content-addressed: identical images share one set of objects,
+    and ImageRefs counts the recipes using each so shared objects outlive the
+    recipes that are deleted first.
+
+    The public API is async. Pillow work runs in a worker process so a large
+    photo can't hold the GIL, blocking backend calls run on a small thread
+    pool, and at most max_concurrent_uploads uploads are processed at once.
+    """
+
+    base_url: str = ""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._image_pool: ProcessPoolExecutor | None = None
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=settings.storage_io_workers, thread_name_prefix="storage-io"
+        )
+        self._upload_slots = asyncio.Semaphore(settings.max_concurrent_uploads)
+        self.uploads_waiting = 0
+        self.uploads_in_progress = 0
+        self.objects_put = 0
+        self.objects_reused = 0
+        self.timings: dict[str, deque[float]] = {}
+
+        self.variant_widths = sorted(settings.image_variant_widths) or [MAX_IMAGE_WIDTH]
+        self.variant_formats = []
+        for image_format in settings.image_variant_formats:
+            if image_format not in IMAGE_FORMATS:
+                raise ValueError(f"Unsupported image format: {image_format}")
+            if image_format != "jpeg" and not features.check(image_format):
+                logger.warning("Pillow lacks %s support; skipping those variants", image_format)
+                continue
+            self.variant_formats.append(image_format)
+
+    def _get_image_pool(self) -> ProcessPoolExecutor:
+        if self._image_pool is None:
+            # spawn rather than fork: forking a process with running threads is unsafe
+            self._image_pool = ProcessPoolExecutor(
+                max_workers=self.settings.image_process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._image_pool
+
+    @contextmanager
+    def _stage(self, name: str, timings: dict[str, float]):
+        """Time one stage of an operation, for the log line and /metrics."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            timings[name] = elapsed
+            self.timings.setdefault(name, deque(maxlen=TIMING_WINDOW)).append(elapsed)
+
+    async def _run_image(self, fn, *args):
+        """Run CPU-bound Pillow work in the image worker process."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_image_pool(), fn, *args)
+        except BrokenProcessPool:
+            # The worker died (e.g. out of memory); start a fresh pool next time
+            self._image_pool = None
+            raise
+
+    async def shrink_for_vision(
+        self, image_data: bytes, max_long_edge: int, max_short_edge: int | None
+    ) -> tuple[bytes, tuple[int, int]]:
+        """Run prepare_vision_image in the image worker process.
+
+        Available with any backend, configured or not, since it stores nothing.
+        """
+        with self._stage("vision", {}):
+            return await self._run_image(
+                prepare_vision_image, image_data, max_long_edge, max_short_edge
+            )
+
+    async def _run_io(self, fn, *args):
+        """Run a blocking storage call on the I/O thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, fn, *args)
+
+    def is_configured(self) -> bool:
+        """Check if the backend has what it needs to store images."""
+        raise NotImplementedError
+
+    def check_ready(self) -> bool:
+        """Check that the backend is reachable and usable right now. Blocking."""
+        raise NotImplementedError
+
+    def _put(self, name: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    def _exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def _get(self, name: str) -> bytes:
+        raise NotImplementedError
+
+    def _size(self, name: str) -> int | None:
+        """Return an object's size in bytes, or None if it doesn't exist."""
+        raise NotImplementedError
+
+    def _delete(self, name: str) -> None:
+        raise NotImplementedError
+
+    def _list(self, prefix: str) -> list[tuple[str, datetime]]:
+        """Return (name, created) for every object whose name starts with prefix."""
+        raise NotImplementedError
+
+    def create_upload_url(self, name: str, content_type: str) -> tuple[str, dict[str, str]]:
+        """Sign a short-lived URL the client can PUT an object to directly.
+
+        Returns the URL and the headers the client must send with the PUT.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def upload_name(recipe_id: str) -> str:
+        """Return a fresh object name for an original uploaded for a recipe."""
+        return f"{UPLOAD_FOLDER}/{recipe_id}/{uuid.uuid4().hex}"
+
+    @staticmethod
+    def is_upload_for(name: str, recipe_id: str) -> bool:
+        """Check that an object name is one upload_name issued for this recipe."""
+        prefix = f"{UPLOAD_FOLDER}/{recipe_id}/"
+        rest = name[len(prefix) :]
+        return name.startswith(prefix) and len(rest) == 32 and rest.isalnum()
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}{name}"
+
+    async def upload_size(self, name: str) -> int | None:
+        """Return the size of a directly uploaded original, or None if it's missing."""
+        return await self._run_io(self._size, name)
+
+    async def stale_uploads(self, min_age_seconds: float) -> list[str]:
+        """Return the names of directly uploaded originals older than min_age_seconds."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_age_seconds)
+        objects = await self._run_io(self._list, f"{UPLOAD_FOLDER}/")
+        return [name for name, created in objects if created < cutoff]
+
+    async def process_upload(self, name: str, refs: ImageRefs) -> StoredImage | None:
+        """Compress a directly uploaded original and store it like a regular upload.
+
+        The original is left in place; the caller deletes it once the recipe
+        points at the processed image.
+        """
+        with self._stage("fetch", {}):
+            image_data = await self._run_io(self._get, name)
+        return await self.upload_image(image_data, "application/octet-stream", refs)
+
+    def _name_from_url(self, image_url: str) -> str | None:
+        """Return the object name for one of our URLs, or None if it isn't ours."""
+        if not image_url or not image_url.startswith(self.base_url):
+            return None
+        return image_url[len(self.base_url) :]
+
+    def is_stored_url(self, image_url: str) -> bool:
+        """Check whether a URL points into this storage, as opposed to another host."""
+        return self._name_from_url(image_url) is not None
 
-    def upload_image(
-        self, image_data: bytes, content_type: str, folder: str = "recipes"
-    ) -> str | None:
-        """Upload an image to GCS and return the public URL.
+    def is_upload_url(self, image_url: str) -> bool:
+        """Check whether a URL is a directly uploaded original."""
+        name = self._name_from_url(image_url)
+        return name is not None and name.startswith(f"{UPLOAD_FOLDER}/")
 
-        Images are automatically compressed and resized before upload.
-        Returns None if GCS is not configured.
+    async def read_image(self, image_url: str) -> bytes | None:
+        """Fetch one of our stored images, or None if it isn't ours or can't be read."""
+        name = self._name_from_url(image_url)
+        if name is None or not self.is_configured():
+            return None
+        try:
+            return await self._run_io(self._get, name)
+        except Exception as e:
+            logger.warning("Could not read image %s: %s", name, e)
+            return None
+
+    async def _put_missing(self, name: str, data: bytes, content_type: str) -> bool:
+        """Upload an object unless it is already stored. Returns True if uploaded."""
+        if await self._run_io(self._exists, name):
+            return False
+        await self._run_io(self._put, name, data, content_type)
+        return True
+
+    async def upload_image(
+        self,
+        image_data: bytes,
+        content_type: str,
+        refs: ImageRefs,
+        folder: str = "recipes",
+    ) -> StoredImage | None:
+        """Upload an image and its responsive variants, returning their public URLs.
+
+        The image is decoded once, then a JPEG fallback at the largest width
+        and every configured width/format variant are rendered. Objects are
+        named by the hash of the fallback, so a repeated upload adds a
+        reference to the existing objects instead of storing them again.
+        Returns None if storage is not configured.
         """
         if not self.is_configured():
             return None
 
-        # Compress and resize image
-        compressed_data, content_type = self._compress_image(image_data)
+        timings: dict[str, float] = {}
+        self.uploads_waiting += 1
+        try:
+            with self._stage("wait", timings):
+                await self._upload_slots.acquire()
+        finally:
+            self.uploads_waiting -= 1
 
-        # Generate unique filename (always jpg after compression)
-        filename = f"{folder}/{uuid.uuid4()}.jpg"
+        self.uploads_in_progress += 1
+        try:
+            # Decode once, then resize and encode every variant
+            with self._stage("compress", timings):
+                fallback_data, rendered = await self._run_image(
+                    render_variants, image_data, self.variant_widths, self.variant_formats
+                )
 
-        blob = self.bucket.blob(filename)
-        blob.upload_from_string(compressed_data, content_type=content_type)
+            # All objects share a stem derived from the compressed output
+            stem = f"{folder}/{hashlib.sha256(fallback_data).hexdigest()}"
+            objects = [(f"{stem}.jpg", fallback_data, "image/jpeg")]
+            variants = []
+            for width, image_format, data in rendered:
+                extension, variant_type = IMAGE_FORMATS[image_format]
+                name = f"{stem}-{width}w.{extension}"
+                objects.append((name, data, variant_type))
+                variants.append(
+                    ImageVariant(
+                        url=f"{self.base_url}{name}", width=width, content_type=variant_type
+                    )
+                )
+            stored = StoredImage(url=f"{self.base_url}{stem}.jpg", variants=variants)
 
-        # Public access is controlled at bucket level (uniform bucket-level access)
-        return f"https://storage.googleapis.com/{self.settings.gcs_bucket_name}/{filename}"
+            # Take the reference before uploading so a concurrent delete of the
+            # same image can't remove objects we're about to point at
+            ref_count = await refs.acquire(stored)
+            try:
+                with self._stage("put", timings):
+                    if ref_count == 1:
+                        # First live reference: write everything, in case a
+                        # previous owner's delete left objects half removed
+                        await asyncio.gather(
+                            *(self._run_io(self._put, *obj) for obj in objects)
+                        )
+                        uploaded = [True] * len(objects)
+                    else:
+                        uploaded = await asyncio.gather(
+                            *(self._put_missing(*obj) for obj in objects)
+                        )
+            except Exception:
+                await self.delete_image(stored.url, refs, stored.variants)
+                raise
+        finally:
+            self.uploads_in_progress -= 1
+            self._upload_slots.release()
+
+        put_count = sum(uploaded)
+        self.objects_put += put_count
+        self.objects_reused += len(objects) - put_count
+        logger.info(
+            "Stored %s (%d bytes -> %d objects, %d uploaded, %d refs): %s",
+            stem,
+            len(image_data),
+            len(objects),
+            put_count,
+            ref_count,
+            ", ".join(f"{stage} {ms * 1000:.0f} ms" for stage, ms in timings.items()),
+        )
+        return stored
+
+    async def _delete_object(self, image_url: str) -> bool:
+        name = self._name_from_url(image_url)
+        if name is None:
+            return False
+        try:
+            await self._run_io(self._delete, name)
+            return True
+        except Exception:
+            return False
+
+    async def delete_upload(self, name: str) -> bool:
+        """Delete a directly uploaded original. Returns True if it was deleted.
+
+        Originals have a fresh name per upload and aren't reference counted,
+        since only the recipe they were uploaded for can point at them.
+        """
+        return await self._delete_object(self.url_for(name))
 
-    def delete_image(self, image_url: str) -> bool:
-        """Delete an image from GCS by its URL.
+    async def delete_image(
+        self,
+        image_url: str,
+        refs: ImageRefs,
+        variants: list[ImageVariant] | None = None,
+    ) -> bool:
+        """Drop a reference to an image, deleting it and its variants if it was the last.
 
-        Returns True if deleted, False otherwise.
+        The reference document is only removed after the objects, so an
+        upload of the same image meanwhile waits and then writes them again.
+        Returns True if the main image was deleted, False otherwise.
         """
         if not self.is_configured() or not image_url:
             return False
 
+        deletion = await refs.release(image_url)
+        if deletion is None:
+            # Still used by another recipe
+            return False
+
+        variant_urls = {v.url for v in deletion.variants} | {v.url for v in variants or []}
+        with self._stage("delete", {}):
+            results = await asyncio.gather(
+                self._delete_object(image_url),
+                *(self._delete_object(url) for url in variant_urls),
+            )
+        await refs.finish_delete(deletion)
+        return results[0]
+
+    def stats(self) -> dict:
+        return {
+            "uploads_waiting": self.uploads_waiting,
+            "uploads_in_progress": self.uploads_in_progress,
+            "objects_put": self.objects_put,
+            "objects_reused": self.objects_reused,
+            "stage_ms_p50": {
+                stage: round(statistics.median(values) * 1000, 1)
+                for stage, values in self.timings.items()
+                if values
+            },
+        }
+
+    def shutdown(self) -> None:
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        if self._image_pool is not None:
+            self._image_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class GCSStorageService(StorageService):
+    """Stores images in a Google Cloud Storage bucket.
+
+    Credentials are loaded once; the storage client, with its authorized HTTP
+    session and cached access token, is created on first use and then reused.
+    """
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings)
+        self.bucket_name = settings.gcs_bucket_name
+        self.base_url = f"https://storage.googleapis.com/{self.bucket_name}/"
+        self.credentials = self._load_credentials() if self.bucket_name else None
+        self._client: storage.Client | None = None
+        self._bucket: storage.Bucket | None = None
+        self._lock = threading.Lock()
+
+    def _load_credentials(self) -> service_account.Credentials | None:
+        # Try JSON string first (for production/Fly.io)
+        if self.settings.gcs_credentials_json:
+            credentials_info = json.loads(self.settings.gcs_credentials_json)
+            return service_account.Credentials.from_service_account_info(credentials_info)
+        # Fall back to file path (for local development)
+        if self.settings.gcs_credentials_file:
+            return service_account.Credentials.from_service_account_file(
+                self.settings.gcs_credentials_file
+            )
+        return None
+
+    @property
+    def bucket(self) -> storage.Bucket:
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    self._client = storage.Client(credentials=self.credentials)
+                    self._bucket = self._client.bucket(self.bucket_name)
+        return self._bucket
+
+    def is_configured(self) -> bool:
+        """Check if GCS is properly configured."""
+        return self.credentials is not None
+
+    def check_ready(self) -> bool:
+        """List at most one object to prove credentials and bucket access work."""
+        if not self.is_configured():
+            return False
         try:
-            # Extract blob name from URL
-            # URL format: https://storage.googleapis.com/bucket-name/path/to/file
-            bucket_url = f"https://storage.googleapis.com/{self.settings.gcs_bucket_name}/"
-            if not image_url.startswith(bucket_url):
-                return False
-
-            blob_name = image_url[len(bucket_url) :]
-            blob = self.bucket.blob(blob_name)
-            blob.delete()
+            next(iter(self.bucket.list_blobs(max_results=1)), None)
             return True
-        except Exception:
+        except Exception as e:
+            logger.warning("GCS readiness check failed: %s", e)
             return False
 
+    def _put(self, name: str, data: bytes, content_type: str) -> None:
+        # Public access is controlled at bucket level (uniform bucket-level access)
+        blob = self.bucket.blob(name)
+        blob.cache_control = IMMUTABLE_CACHE_CONTROL
+        blob.upload_from_string(data, content_type=content_type)
+
+    def _exists(self, name: str) -> bool:
+        return self.bucket.blob(name).exists()
+
+    def _get(self, name: str) -> bytes:
+        return self.bucket.blob(name).download_as_bytes()
+
+    def _size(self, name: str) -> int | None:
+        blob = self.bucket.get_blob(name)
+        return blob.size if blob else None
+
+    def _list(self, prefix: str) -> list[tuple[str, datetime]]:
+        return [(blob.name, blob.time_created) for blob in self.bucket.list_blobs(prefix=prefix)]
+
+    def create_upload_url(self, name: str, content_type: str) -> tuple[str, dict[str, str]]:
+        """Sign a V4 PUT URL with the service account key. No network call."""
+        # GCS rejects the PUT if the body is outside this range
+        headers = {
+            "x-goog-content-length-range": f"0,{self.settings.direct_upload_max_bytes}"
+        }
+        url = self.bucket.blob(name).generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=self.settings.direct_upload_expire_seconds),
+            method="PUT",
+            content_type=content_type,
+            headers=headers,
+            credentials=self.credentials,
+        )
+        return url, {"Content-Type": content_type, **headers}
+
+    def _delete(self, name: str) -> None:
+        self.bucket.blob(name).delete()
+
+
+class LocalStorageService(StorageService):
+    """Stores images on the local filesystem, for development and tests.
+
+    Files are served by the app under settings.local_storage_url.
+    """
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings)
+        self.root = Path(settings.local_storage_dir)
+        self.base_url = settings.local_storage_url.rstrip("/") + "/"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def is_configured(self) -> bool:
+        return True
+
+    def check_ready(self) -> bool:
+        return self.root.is_dir() and os.access(self.root, os.W_OK)
+
+    def _path(self, name: str) -> Path:
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Invalid object name: {name}")
+        return path
+
+    def _put(self, name: str, data: bytes, content_type: str) -> None:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so readers never see a partial file
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _exists(self, name: str) -> bool:
+        return self._path(name).is_file()
+
+    def _get(self, name: str) -> bytes:
+        return self._path(name).read_bytes()
+
+    def _size(self, name: str) -> int | None:
+        path = self._path(name)
+        return path.stat().st_size if path.is_file() else None
+
+    def _list(self, prefix: str) -> list[tuple[str, datetime]]:
+        # Prefixes are folders ("uploads/"), so only that folder is walked
+        root = self.root.resolve()
+        folder = self._path(prefix)
+        if not folder.is_dir():
+            return []
+        return [
+            (
+                path.relative_to(root).as_posix(),
+                datetime.fromtimestamp(path.stat().st_mtime, timezone.utc),
+            )
+            for path in folder.rglob("*")
+            if path.is_file()
+        ]
+
+    def _delete(self, name: str) -> None:
+        self._path(name).unlink()
+
+    def _upload_signature(self, name: str, content_type: str, expires: int) -> str:
+        message = f"{name}\n{content_type}\n{expires}".encode()
+        return hmac.new(
+            self.settings.jwt_secret.encode(), message, hashlib.sha256
+        ).hexdigest()
+
+    def create_upload_url(self, name: str, content_type: str) -> tuple[str, dict[str, str]]:
+        """Sign a URL for the app's own upload route, standing in for a bucket."""
+        expires = int(time.time()) + self.settings.direct_upload_expire_seconds
+        query = urlencode(
+            {"expires": expires, "signature": self._upload_signature(name, content_type, expires)}
+        )
+        return f"{LOCAL_UPLOAD_PATH}/{name}?{query}", {"Content-Type": content_type}
+
+    def verify_upload(
+        self, name: str, content_type: str, expires: int, signature: str
+    ) -> bool:
+        """Check a signed upload URL issued by create_upload_url."""
+        if expires < time.time():
+            return False
+        expected = self._upload_signature(name, content_type, expires)
+        return hmac.compare_digest(expected, signature)
+
+    async def save_upload(self, name: str, data: bytes, content_type: str) -> None:
+        await self._run_io(self._put, name, data, content_type)
+
+
+class MediaFiles(StaticFiles):
+    """Serves LocalStorageService objects with the same long-lived caching as GCS."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
 
+@lru_cache
 def get_storage_service() -> StorageService:
-    """Dependency that creates a StorageService."""
-    return StorageService()
+    """Dependency that returns the app-lifetime StorageService for the configured backend."""
+    settings = get_settings()
+    if settings.storage_backend == "local":
+        return LocalStorageService(settings)
+    return GCSStorageService(settings)
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.config import get_settings
+
+
+class TokenCache:
+    """Bounded LRU of JWTs that have already passed signature verification.
+
+    Entries are keyed by a SHA-256 digest of the token, so raw tokens are never
+    kept in memory, and hold only the decoded `sub` and `exp`. An entry is
+    dropped once the token's own `exp` passes. The whole cache is purged when
+    the signing secret or algorithm changes.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+        self._secret_fingerprint: bytes | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def _check_secret(self, secret: str, algorithm: str) -> None:
+        fingerprint = hashlib.sha256(f"{algorithm}:{secret}".encode("utf-8")).digest()
+        if fingerprint != self._secret_fingerprint:
+            self._entries.clear()
+            self._secret_fingerprint = fingerprint
+
+    def get(self, token: str, secret: str, algorithm: str) -> str | None:
+        """Return the cached user ID for a token, or None if not cached or expired."""
+        self._check_secret(secret, algorithm)
+        key = self._digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user_id
+
+    def set(
+        self, token: str, user_id: str, expires_at: float, secret: str, algorithm: str
+    ) -> None:
+        """Remember a verified token until its expiry."""
+        self._check_secret(secret, algorithm)
+        key = self._digest(token)
+        self._entries[key] = (user_id, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+@lru_cache
+def get_token_cache() -> TokenCache:
+    """Return the process-wide verified-token cache."""
+    return TokenCache(get_settings().jwt_cache_max_entries)
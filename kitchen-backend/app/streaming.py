@@ -0,0 +1,174 @@
+import io
+import json
+import logging
+import zipfile
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.models.recipe import StreamFormat
+from app.services.image_ingest import HTTP_413_CONTENT_TOO_LARGE
+
+logger = logging.getLogger(__name__)
+
+# Number of encoded documents buffered before a chunk is written to the client
+STREAM_CHUNK_SIZE = 100
+
+MEDIA_TYPES: dict[str, str] = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+# Archive members that are already compressed and would only cost CPU to deflate
+STORED_SUFFIXES = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif")
+
+# Ask proxies (nginx, Fly's edge) not to buffer or cache event streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _dumps(obj: dict) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+async def json_array_chunks(
+    docs: AsyncIterable[dict],
+    transform: Callable[[dict], dict],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Encode documents into a single JSON array, one chunk per chunk_size documents."""
+    yield b"["
+    buffer: list[str] = []
+    separator = ""
+    async for doc in docs:
+        buffer.append(_dumps(transform(doc)))
+        if len(buffer) >= chunk_size:
+            yield (separator + ",".join(buffer)).encode("utf-8")
+            separator = ","
+            buffer = []
+    if buffer:
+        yield (separator + ",".join(buffer)).encode("utf-8")
+    yield b"]"
+
+
+async def ndjson_chunks(
+    docs: AsyncIterable[dict],
+    transform: Callable[[dict], dict],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Encode documents as newline-delimited JSON, one chunk per chunk_size documents."""
+    buffer: list[str] = []
+    async for doc in docs:
+        buffer.append(_dumps(transform(doc)) + "\n")
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def stream_documents(
+    docs: AsyncIterable[dict],
+    transform: Callable[[dict], dict],
+    stream_format: StreamFormat,
+    headers: dict[str, str] | None = None,
+) -> StreamingResponse:
+    """Build a StreamingResponse that encodes documents as the cursor yields them."""
+    encoder = ndjson_chunks if stream_format == "ndjson" else json_array_chunks
+    return StreamingResponse(
+        encoder(docs, transform), media_type=MEDIA_TYPES[stream_format], headers=headers
+    )
+
+
+async def ndjson_lines(
+    chunks: AsyncIterable[bytes], max_bytes: int
+) -> AsyncIterator[tuple[int, bytes]]:
+    """Split a streamed request body into (line number, line) pairs, numbered from 1.
+
+    Raises HTTPException 413 once more than max_bytes have arrived.
+    """
+    received = 0
+    line_number = 0
+    pending = b""
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(
+                status_code=HTTP_413_CONTENT_TOO_LARGE,
+                detail=f"Import must be at most {max_bytes // 1_000_000} MB",
+            )
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, line
+    if pending:
+        yield line_number + 1, pending
+
+
+class _ZipBuffer(io.RawIOBase):
+    """Write-only sink that hands zipfile's output back in pieces.
+
+    It isn't seekable, so zipfile writes each member's sizes after its data
+    instead of seeking back to the header.
+    """
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def zip_chunks(files: AsyncIterable[tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """Build a zip archive as the files arrive, one chunk per member.
+
+    Only the member being written is held in memory. Images are stored
+    as-is; everything else is deflated.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        async for name, data in files:
+            compress_type = (
+                zipfile.ZIP_STORED if name.endswith(STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            )
+            archive.writestr(name, data, compress_type=compress_type)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {_dumps(data)}\n\n".encode("utf-8")
+
+
+async def sse_chunks(events: AsyncIterable[tuple[str, dict]]) -> AsyncIterator[bytes]:
+    """Encode (event, data) pairs as Server-Sent Events, one chunk per event.
+
+    The status line has already been sent by the time the source fails, so
+    a failure becomes a final "error" event instead of an error response.
+    """
+    try:
+        async for event, data in events:
+            yield sse_event(event, data)
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+    except Exception:
+        logger.exception("Event stream failed")
+        yield sse_event("error", {"detail": "Internal server error"})
+
+
+def stream_events(events: AsyncIterable[tuple[str, dict]]) -> StreamingResponse:
+    """Build a text/event-stream response that sends each event as it is produced."""
+    return StreamingResponse(
+        sse_chunks(events), media_type="text/event-stream", headers=SSE_HEADERS
+    )
@@ -0,0 +1,134 @@
+"""Compare the draft-mode variant pipeline with the original full-decode path.
+
+Each path runs in a fresh process over the same corpus so peak RSS is measured
+independently. Both render the default variant widths and formats, as an
+upload does. Point it at a folder of phone photos; without one it generates
+synthetic 12 MP JPEGs:
+
+    python -m benchmarks.image_compress --corpus ~/Pictures/phone
+"""
+
+import argparse
+import io
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from app.config import Settings
+from app.services.storage_service import encode_image, render_variants
+
+VARIANT_WIDTHS = Settings.model_fields["image_variant_widths"].default
+VARIANT_FORMATS = Settings.model_fields["image_variant_formats"].default
+
+
+def legacy_decode(image_data: bytes, max_width: int) -> Image.Image:
+    """Decoding before draft mode: the full bitmap, then resize."""
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        if image.mode == "P":
+            image = image.convert("RGBA")
+        background.paste(image, mask=image.split()[-1] if image.mode == "RGBA" else None)
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    if image.width > max_width:
+        ratio = max_width / image.width
+        image = image.resize((max_width, int(image.height * ratio)), Image.LANCZOS)
+    return image
+
+
+def legacy_render_variants(image_data: bytes) -> tuple[bytes, list[tuple[int, str, bytes]]]:
+    """render_variants on top of legacy_decode."""
+    image = legacy_decode(image_data, max(VARIANT_WIDTHS))
+    fallback = encode_image(image, "jpeg")
+    variants = []
+    for width in sorted({min(w, image.width) for w in VARIANT_WIDTHS}, reverse=True):
+        if width < image.width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for image_format in VARIANT_FORMATS:
+            variants.append((width, image_format, encode_image(image, image_format)))
+    return fallback, variants
+
+
+def draft_render_variants(image_data: bytes) -> tuple[bytes, list[tuple[int, str, bytes]]]:
+    return render_variants(image_data, VARIANT_WIDTHS, VARIANT_FORMATS)
+
+
+PATHS = {"legacy": legacy_render_variants, "draft": draft_render_variants}
+
+
+def _run_path(name: str, files: list[str], repeat: int) -> tuple[float, int]:
+    """Process the corpus in this (fresh) process; return (seconds, peak RSS in KiB)."""
+    fn = PATHS[name]
+    corpus = [Path(f).read_bytes() for f in files]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in corpus:
+            fn(data)
+    elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _synthetic_corpus(directory: Path, count: int) -> list[str]:
+    files = []
+    for i in range(count):
+        # 4032x3024 is a typical 12 MP phone photo
+        extent = (-2.0 + i * 0.1, -1.2, 1.0, 1.2)
+        image = Image.effect_mandelbrot((4032, 3024), extent, 100)
+        path = directory / f"synthetic-{i}.jpg"
+        image.convert("RGB").save(path, format="JPEG", quality=92)
+        files.append(str(path))
+    return files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, help="directory of JPEG/PNG photos")
+    parser.add_argument(
+        "--synthetic", type=int, default=5, help="images to generate without --corpus"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Children inherit the parent's RSS high-water mark on Linux, so keep all
+    # heavy work (including generating the corpus) out of this process
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            files = sorted(
+                str(p)
+                for p in args.corpus.iterdir()
+                if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+            )
+        else:
+            with ctx.Pool(1) as pool:
+                files = pool.apply(_synthetic_corpus, (Path(tmp), args.synthetic))
+
+        total_mb = sum(Path(f).stat().st_size for f in files) / 1e6
+        print(f"{len(files)} images, {total_mb:.1f} MB, {args.repeat} passes")
+
+        results = {}
+        for name in PATHS:
+            with ctx.Pool(1) as pool:
+                results[name] = pool.apply(_run_path, (name, files, args.repeat))
+
+        runs = len(files) * args.repeat
+        for name, (elapsed, peak_kib) in results.items():
+            print(
+                f"{name:>7}: {elapsed / runs * 1000:7.1f} ms/image  "
+                f"peak RSS {peak_kib / 1024:6.1f} MiB"
+            )
+        legacy, draft = results["legacy"], results["draft"]
+        print(
+            f"speedup {legacy[0] / draft[0]:.1f}x, "
+            f"peak RSS {draft[1] / legacy[1]:.0%} of legacy"
+        )
+
+
+if __name__ == "__main__":
+    main()
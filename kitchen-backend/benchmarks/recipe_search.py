@@ -0,0 +1,148 @@
+"""Measure recipe search latency over a large synthetic catalogue.
+
+Seeds a scratch database with synthetic recipes (a tenth of them private),
+creates the registered recipes indexes, then times RecipeService.search for a
+mix of common, rare and multi-word queries, anonymously and signed in. Needs a
+real MongoDB; run from kitchen-backend/ so the usual .env is picked up:
+
+    python -m benchmarks.recipe_search --recipes 100000 --queries 500
+
+The scratch database is dropped afterwards unless --keep is passed.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from app.config import get_settings
+from app.indexes import INDEXES
+from app.services.recipe_service import RecipeService
+
+SEED_BATCH_SIZE = 5000
+USERS = 1000
+
+ADJECTIVES = [
+    "spicy", "smoky", "creamy", "crispy", "roasted", "grilled", "braised", "quick",
+    "easy", "rustic", "lemony", "garlicky", "sweet", "tangy", "hearty", "classic",
+]
+DISHES = [
+    "soup", "stew", "curry", "salad", "pasta", "risotto", "tacos", "pie", "bread",
+    "noodles", "casserole", "chili", "stir fry", "skillet", "bake", "sandwich",
+]
+INGREDIENTS = [
+    "tomato", "chicken", "beef", "tofu", "lentils", "chickpeas", "mushroom", "spinach",
+    "potato", "carrot", "onion", "garlic", "ginger", "basil", "cilantro", "lime",
+    "lemon", "coconut milk", "rice", "quinoa", "salmon", "shrimp", "pork", "eggplant",
+    "zucchini", "pumpkin", "feta", "parmesan", "cheddar", "yogurt", "paprika", "cumin",
+    "saffron", "fennel", "leek", "kale", "bacon", "black beans", "corn", "avocado",
+]
+# Seeded rarely so some queries match only a handful of recipes
+RARE_INGREDIENTS = ["sumac", "yuzu", "gochujang", "tamarind", "za'atar", "miso"]
+FILLER = (
+    "A weeknight favourite that comes together in one pan with pantry staples. "
+    "Serve it warm with crusty bread and a simple green salad on the side."
+)
+
+QUERIES = {
+    "common word": ["chicken", "tomato", "soup", "garlic", "rice"],
+    "two words": ["spicy chicken", "tomato soup", "lentil curry", "salmon rice"],
+    "rare word": RARE_INGREDIENTS,
+    "phrase": ['"coconut milk"', '"black beans" tacos'],
+}
+
+
+def _synthetic_recipe(rng: random.Random) -> dict:
+    main = rng.choice(INGREDIENTS)
+    ingredients = rng.sample(INGREDIENTS, rng.randint(5, 12))
+    if rng.random() < 0.002:
+        ingredients.append(rng.choice(RARE_INGREDIENTS))
+    return {
+        "title": f"{rng.choice(ADJECTIVES).title()} {main} {rng.choice(DISHES)}",
+        "description": f"{rng.choice(ADJECTIVES).title()} and full of {main}. {FILLER}",
+        "ingredients": [f"{rng.randint(1, 4)} cups {name}" for name in ingredients],
+        "directions": [f"Step {i + 1}: prepare and cook." for i in range(rng.randint(3, 8))],
+        "is_public": rng.random() >= 0.1,
+        "user_id": f"user-{rng.randrange(USERS)}",
+        "image_url": None,
+        "image_variants": [],
+    }
+
+
+async def _seed(db: AsyncIOMotorDatabase, count: int) -> None:
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for offset in range(0, count, SEED_BATCH_SIZE):
+        batch = [_synthetic_recipe(rng) for _ in range(min(SEED_BATCH_SIZE, count - offset))]
+        await db.recipes.insert_many(batch, ordered=False)
+    print(f"seeded {count} recipes in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    for spec in INDEXES:
+        if spec.collection == "recipes":
+            await db.recipes.create_indexes([spec.to_index_model()])
+    print(f"built recipes indexes in {time.perf_counter() - start:.1f} s")
+
+
+def _percentile(samples: list[float], pct: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def _measure(service: RecipeService, queries: list[str], user_id: str | None, runs: int):
+    rng = random.Random(1)
+    latencies = []
+    results = 0
+    for _ in range(runs):
+        query = rng.choice(queries)
+        start = time.perf_counter()
+        page = await service.search(query, user_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results += len(page.items)
+    return latencies, results / runs
+
+
+async def _main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(args.uri or settings.effective_mongodb_uri)
+    db = client[args.database]
+    try:
+        if args.reseed or await db.recipes.estimated_document_count() != args.recipes:
+            await db.recipes.drop()
+            await _seed(db, args.recipes)
+
+        service = RecipeService(db)
+        # Warm the index into memory before timing
+        await _measure(service, sum(QUERIES.values(), []), None, 20)
+
+        print(f"recipes={args.recipes} queries per row={args.queries} page size=50")
+        print(f"{'query':<14}{'caller':<11}{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}{'hits':>6}")
+        for label, queries in QUERIES.items():
+            for caller, user_id in (("anonymous", None), ("signed in", "user-7")):
+                latencies, hits = await _measure(service, queries, user_id, args.queries)
+                print(
+                    f"{label:<14}{caller:<11}{_percentile(latencies, 50):8.1f}"
+                    f"{_percentile(latencies, 95):8.1f}{max(latencies):8.1f}{hits:6.1f}"
+                )
+    finally:
+        if not args.keep:
+            await client.drop_database(args.database)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500, help="timed searches per row")
+    parser.add_argument("--uri", help="MongoDB URI (default: the configured one)")
+    parser.add_argument("--database", default="benchmark_recipe_search")
+    parser.add_argument("--reseed", action="store_true", help="reseed a kept database")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
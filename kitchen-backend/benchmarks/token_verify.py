@@ -0,0 +1,54 @@
+"""Measure per-request JWT verification overhead with and without the token cache.
+
+Simulates authenticated traffic that reuses a fixed pool of tokens, the way
+returning users do. Run from kitchen-backend/ so the usual .env is picked up:
+
+    python -m benchmarks.token_verify --tokens 2000 --requests 100000
+"""
+
+import argparse
+import random
+import time
+
+from jose import jwt
+
+from app.config import Settings
+from app.services.auth_service import create_access_token, verify_token
+from app.services.token_cache import get_token_cache
+
+
+def _uncached_verify(token: str, settings: Settings) -> str | None:
+    payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    return payload.get("sub")
+
+
+def _run(verify, tokens: list[str], requests: int, settings: Settings) -> float:
+    rng = random.Random(0)
+    order = [rng.choice(tokens) for _ in range(requests)]
+    start = time.perf_counter()
+    for token in order:
+        verify(token, settings)
+    return (time.perf_counter() - start) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    settings = Settings(mongodb_uri="unused", openai_api_key="unused", jwt_secret="benchmark")
+    tokens = [create_access_token(f"user-{i}", settings) for i in range(args.tokens)]
+
+    before = _run(_uncached_verify, tokens, args.requests, settings)
+    get_token_cache().clear()
+    after = _run(verify_token, tokens, args.requests, settings)
+
+    print(f"tokens={args.tokens} requests={args.requests}")
+    print(f"jwt.decode every request: {before * 1e6:8.1f} us/request")
+    print(f"verified-token cache:     {after * 1e6:8.1f} us/request")
+    print(f"speedup: {before / after:.1f}x  cache: {get_token_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
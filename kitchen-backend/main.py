@@ -1,15 +1,27 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 
+from app.clients import close_clients, open_clients
 from app.config import get_settings
-from app.database import close_mongo_connection, connect_to_mongo
-from app.routes import auth, generate, recipes
+from app.database import close_mongo_connection, connect_to_mongo, get_database
+from app.routes import auth, generate, recipes, uploads
+from app.services.auth_service import require_metrics_token
+from app.services.generation_queue import get_generation_queue
+from app.services.image_hash_cache import get_image_result_cache
+from app.services.image_ingest import UploadLimitMiddleware, get_image_ingestor
+from app.services.image_worker import get_image_worker, get_upload_sweeper
+from app.services.password_hasher import get_password_hasher
+from app.services.prompt_cache import get_prompt_cache
+from app.services.recipe_cache import get_recipe_cache
+from app.services.storage_service import MediaFiles, get_storage_service
+from app.services.token_cache import get_token_cache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,9 +33,21 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
+    settings = get_settings()
     await connect_to_mongo()
+    await open_clients()
+    get_generation_queue().start()
+    if settings.image_background_processing:
+        get_image_worker().start()
+    get_upload_sweeper().start()
     yield
+    await get_upload_sweeper().stop()
+    await get_image_worker().stop()
+    await get_generation_queue().stop()
+    await close_clients()
     await close_mongo_connection()
+    get_password_hasher().shutdown()
+    get_storage_service().shutdown()
 
 
 def create_app() -> FastAPI:
@@ -37,6 +61,8 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
+    # Added first so CORS headers are also set on its 413 responses
+    app.add_middleware(UploadLimitMiddleware, ingestor=get_image_ingestor())
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins,
@@ -48,11 +74,55 @@ def create_app() -> FastAPI:
     app.include_router(auth.router)
     app.include_router(recipes.router)
     app.include_router(generate.router)
+    app.include_router(uploads.router)
 
     @app.get("/health")
     async def health_check():
         return {"status": "ok"}
 
+    @app.get("/ready")
+    async def readiness_check():
+        """Check that the database and image storage are usable."""
+        checks = {"database": True, "storage": True}
+        try:
+            await get_database().command("ping")
+        except Exception:
+            checks["database"] = False
+
+        storage = get_storage_service()
+        if storage.is_configured():
+            checks["storage"] = await asyncio.to_thread(storage.check_ready)
+
+        ready = all(checks.values())
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content={"status": "ok" if ready else "unavailable", **checks},
+        )
+
+    @app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+    async def metrics():
+        """Expose in-process counters used to size caches and pools.
+
+        Requires METRICS_TOKEN as a bearer token.
+        """
+        return {
+            "recipe_cache": get_recipe_cache().stats(),
+            "prompt_cache": get_prompt_cache().stats(),
+            "image_cache": get_image_result_cache().stats(),
+            "generation_queue": get_generation_queue().stats(),
+            "password_hasher": get_password_hasher().stats(),
+            "token_cache": get_token_cache().stats(),
+            "storage": get_storage_service().stats(),
+            "image_worker": get_image_worker().stats(),
+            "upload_sweeper": get_upload_sweeper().stats(),
+            "image_ingest": get_image_ingestor().stats(),
+        }
+
+    # Serve locally stored images when not using GCS
+    if settings.storage_backend == "local":
+        storage = get_storage_service()
+        app.mount(settings.local_storage_url, MediaFiles(directory=storage.root), name="media")
+
     # Serve static frontend files in production
     public_path = Path(__file__).parent / "public"
     if public_path.exists():
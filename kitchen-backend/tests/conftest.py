@@ -0,0 +1,8 @@
+import os
+
+# Settings are required at import time (main builds the app on import), so
+# give the tests harmless values before anything reads them
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("ENVIRONMENT", "test")
@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.models.recipe import RecipeCreate
+from app.services.generation_queue import (
+    FINISHED_STATUSES,
+    GenerationQueue,
+    MemoryJobStore,
+    TokenBucket,
+)
+
+
+def rate_limit_error(code: str | None = None, retry_after: str = "0.05") -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": retry_after})
+    body = {"code": code} if code else None
+    return openai.RateLimitError("Rate limit reached", response=response, body=body)
+
+
+class FakeGenerateService:
+    """Raises the queued errors in order, then returns a recipe named after the prompt."""
+
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.calls = 0
+
+    async def recipe_from_prompt(self, prompt_text: str, regenerate: bool) -> RecipeCreate:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return RecipeCreate(title=prompt_text, description="Generated", ingredients=["salt"])
+
+
+class FlakyJobStore(MemoryJobStore):
+    """Fails the first claim, like a dropped database connection."""
+
+    def __init__(self):
+        super().__init__()
+        self.claim_failures = 1
+
+    async def claim(self, lease_seconds: float) -> dict | None:
+        if self.claim_failures:
+            self.claim_failures -= 1
+            raise RuntimeError("connection reset")
+        return await super().claim(lease_seconds)
+
+
+def make_queue(service: FakeGenerateService, store: MemoryJobStore | None = None):
+    return GenerationQueue(
+        store or MemoryJobStore(),
+        lambda: service,
+        concurrency=2,
+        bucket=TokenBucket(rate=100, capacity=10),
+        max_attempts=3,
+        retry_base_seconds=0.01,
+        retry_max_seconds=0.05,
+        max_pending=10,
+        lease_seconds=30,
+        retention_seconds=60,
+        poll_seconds=0.01,
+    )
+
+
+@pytest.fixture
+async def running():
+    queues = []
+
+    def start(queue: GenerationQueue) -> GenerationQueue:
+        queue.start()
+        queues.append(queue)
+        return queue
+
+    yield start
+    for queue in queues:
+        await queue.stop()
+
+
+async def wait_until_finished(queue: GenerationQueue, job_id: str) -> dict:
+    async def poll() -> dict:
+        while True:
+            job = await queue.get(job_id)
+            if job["status"] in FINISHED_STATUSES:
+                return job
+            await asyncio.sleep(0.01)
+
+    return await asyncio.wait_for(poll(), timeout=5)
+
+
+async def test_rate_limited_job_is_retried(running):
+    service = FakeGenerateService([rate_limit_error()])
+    queue = running(make_queue(service))
+
+    submitted = await queue.submit_prompt("tomato soup")
+    job = await wait_until_finished(queue, submitted["_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["recipe"]["title"] == "tomato soup"
+    assert job["attempts"] == 2
+    assert service.calls == 2
+    stats = queue.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["retried"] == 1
+    assert stats["succeeded"] == 1
+    # The 429 paused the bucket for every worker, at least for its retry-after
+    assert queue.bucket.paused_until > 0
+
+
+async def test_out_of_quota_is_not_retried(running):
+    service = FakeGenerateService([rate_limit_error(code="insufficient_quota")])
+    queue = running(make_queue(service))
+
+    submitted = await queue.submit_prompt("tomato soup")
+    job = await wait_until_finished(queue, submitted["_id"])
+
+    assert job["status"] == "failed"
+    assert job["error"] == "OpenAI rate limit exceeded"
+    assert service.calls == 1
+    assert queue.stats()["retried"] == 0
+
+
+async def test_worker_survives_a_failed_claim(running):
+    service = FakeGenerateService([])
+    queue = running(make_queue(service, FlakyJobStore()))
+
+    submitted = await queue.submit_prompt("tomato soup")
+    job = await wait_until_finished(queue, submitted["_id"])
+
+    assert job["status"] == "succeeded"
+    assert queue.stats()["running"] is True
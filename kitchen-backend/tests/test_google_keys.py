@@ -0,0 +1,128 @@
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app.services import google_keys
+from app.services.google_keys import (
+    MIN_FORCED_REFRESH_INTERVAL,
+    GoogleTokenVerifier,
+    StaticKeySource,
+)
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+KEY_ID = "test-key"
+
+
+class FakeClock:
+    """Stands in for the time module in google_keys, so tests can skip ahead."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FlakyKeySource:
+    """Serves a fixed JWK set, or fails like an unreachable endpoint while down."""
+
+    def __init__(self, jwks: dict, max_age: int | None = None):
+        self.source = StaticKeySource(jwks, max_age)
+        self.down = False
+        self.fetches = 0
+
+    async def fetch(self) -> tuple[dict, int | None]:
+        self.fetches += 1
+        if self.down:
+            raise httpx.ConnectError("certs endpoint unreachable")
+        return await self.source.fetch()
+
+
+@pytest.fixture(scope="module")
+def signing_key() -> tuple[bytes, dict]:
+    """An RSA private key in PEM and its public half as a JWK set."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    return private_pem, {"keys": [{**public_jwk, "kid": KEY_ID, "use": "sig"}]}
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(google_keys, "time", clock)
+    return clock
+
+
+def google_token(private_pem: bytes) -> str:
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "cook@example.com",
+        "iat": now,
+        "exp": now + 600,
+    }
+    return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": KEY_ID})
+
+
+async def test_verifies_token_against_fetched_keys(signing_key, clock):
+    private_pem, jwks = signing_key
+    source = FlakyKeySource(jwks)
+    verifier = GoogleTokenVerifier(source)
+
+    claims = await verifier.verify(google_token(private_pem), CLIENT_ID)
+
+    assert claims["sub"] == "1234567890"
+    assert source.fetches == 1
+
+
+async def test_failed_fetch_without_keys_backs_off(signing_key, clock):
+    private_pem, jwks = signing_key
+    source = FlakyKeySource(jwks)
+    source.down = True
+    verifier = GoogleTokenVerifier(source)
+    token = google_token(private_pem)
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as excinfo:
+            await verifier.verify(token, CLIENT_ID)
+        assert excinfo.value.status_code == 503
+    # Logins during the backoff fail fast instead of each waiting on a fetch
+    assert source.fetches == 1
+
+    source.down = False
+    clock.now += MIN_FORCED_REFRESH_INTERVAL
+    assert await verifier.verify(token, CLIENT_ID) is not None
+    assert source.fetches == 2
+
+
+async def test_failed_refresh_keeps_serving_stale_keys(signing_key, clock):
+    private_pem, jwks = signing_key
+    source = FlakyKeySource(jwks, max_age=300)
+    verifier = GoogleTokenVerifier(source)
+    token = google_token(private_pem)
+    assert await verifier.verify(token, CLIENT_ID) is not None
+
+    source.down = True
+    clock.now += 301
+    assert await verifier.verify(token, CLIENT_ID) is not None
+    assert await verifier.verify(token, CLIENT_ID) is not None
+    assert source.fetches == 2
+
+    clock.now += MIN_FORCED_REFRESH_INTERVAL
+    assert await verifier.verify(token, CLIENT_ID) is not None
+    assert source.fetches == 3
@@ -0,0 +1,149 @@
+import asyncio
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from PIL import Image
+
+import main
+from app.config import get_settings
+from app.database import database
+from app.services.auth_service import create_access_token
+from app.services.image_worker import UploadSweeper, get_image_worker
+from app.services.recipe_cache import get_recipe_cache
+from app.services.storage_service import get_storage_service
+
+# Process-wide singletons that read the settings changed below
+CACHED_GETTERS = (get_settings, get_storage_service, get_recipe_cache, get_image_worker)
+
+
+@pytest.fixture
+def storage_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_DIR", str(tmp_path))
+    for getter in CACHED_GETTERS:
+        getter.cache_clear()
+    yield tmp_path
+    get_storage_service().shutdown()
+    for getter in CACHED_GETTERS:
+        getter.cache_clear()
+
+
+@pytest.fixture
+def client(storage_root, monkeypatch) -> TestClient:
+    monkeypatch.setattr(database, "db", AsyncMongoMockClient()["kitchen_test"])
+    # Not entered as a context manager, so the lifespan (real MongoDB,
+    # background workers) never runs
+    return TestClient(main.create_app())
+
+
+@pytest.fixture
+def headers(client) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token('cook-1', get_settings())}"}
+
+
+def jpeg_bytes() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (180, 90, 30)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def create_recipe(client: TestClient, headers: dict[str, str]) -> str:
+    response = client.post(
+        "/api/recipes",
+        json={"title": "Tomato soup", "description": "Warm", "ingredients": ["tomato"]},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def upload_original(client: TestClient, headers: dict[str, str], recipe_id: str) -> str:
+    """Get a signed upload URL for the recipe and PUT a photo to it, like a browser."""
+    response = client.post(
+        f"/api/recipes/{recipe_id}/image/upload-url",
+        json={"content_type": "image/jpeg"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    ticket = response.json()
+    response = client.put(ticket["upload_url"], content=jpeg_bytes(), headers=ticket["headers"])
+    assert response.status_code == 204
+    return ticket["object_name"]
+
+
+def test_signed_upload_is_finalized_and_abandoned_uploads_are_swept(
+    client, headers, storage_root
+):
+    recipe_id = create_recipe(client, headers)
+    finalized = upload_original(client, headers, recipe_id)
+    abandoned = upload_original(client, headers, recipe_id)
+
+    response = client.post(
+        f"/api/recipes/{recipe_id}/image/finalize",
+        json={"object_name": finalized},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    image_url = response.json()["image_url"]
+    assert not get_storage_service().is_upload_url(image_url)
+    assert client.get(image_url).status_code == 200
+    # The processed image replaces the original, which finalize deletes
+    assert not (storage_root / finalized).exists()
+    assert (storage_root / abandoned).exists()
+
+    sweeper = UploadSweeper(interval=3600, min_age=0)
+    assert asyncio.run(sweeper.sweep()) == 1
+    assert not (storage_root / abandoned).exists()
+    assert client.get(image_url).status_code == 200
+
+
+def test_sweep_keeps_an_original_the_recipe_still_shows(
+    client, headers, storage_root, monkeypatch
+):
+    # Finalize shows the original and leaves compression to the image
+    # worker, which isn't running here, like a job lost in a restart
+    monkeypatch.setenv("IMAGE_BACKGROUND_PROCESSING", "true")
+    get_settings.cache_clear()
+    recipe_id = create_recipe(client, headers)
+    original = upload_original(client, headers, recipe_id)
+
+    response = client.post(
+        f"/api/recipes/{recipe_id}/image/finalize",
+        json={"object_name": original},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["image_url"] == get_storage_service().url_for(original)
+
+    sweeper = UploadSweeper(interval=3600, min_age=0)
+    assert asyncio.run(sweeper.sweep()) == 0
+    assert (storage_root / original).exists()
+    assert sweeper.stats()["kept"] == 1
+
+
+def test_sweep_spares_recent_uploads(client, headers, storage_root):
+    recipe_id = create_recipe(client, headers)
+    abandoned = upload_original(client, headers, recipe_id)
+
+    sweeper = UploadSweeper(interval=3600, min_age=3600)
+    assert asyncio.run(sweeper.sweep()) == 0
+    assert (storage_root / abandoned).exists()
+
+
+def test_tampered_upload_url_is_rejected(client, headers, storage_root):
+    recipe_id = create_recipe(client, headers)
+    response = client.post(
+        f"/api/recipes/{recipe_id}/image/upload-url",
+        json={"content_type": "image/jpeg"},
+        headers=headers,
+    )
+    ticket = response.json()
+
+    response = client.put(
+        ticket["upload_url"], content=jpeg_bytes(), headers={"Content-Type": "image/png"}
+    )
+
+    assert response.status_code == 403
+    assert not (storage_root / ticket["object_name"]).exists()
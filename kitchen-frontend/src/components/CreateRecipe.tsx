@@ -4,10 +4,10 @@ import TabContext from '@mui/lab/TabContext';
 import TabList from '@mui/lab/TabList';
 import TabPanel from '@mui/lab/TabPanel';
 
-import { NewRecipe } from '../types';
+import { GeneratedRecipe, NewRecipe } from '../types';
 import RecipeForm from './RecipeForm';
 import { createRecipe } from '../reducers/recipeReducer';
-import generateService from '../services/generate';
+import generateService, { applyDelta } from '../services/generate';
 import recipeService from '../services/recipes';
 import { useAppDispatch, useAppSelector } from '../hooks';
 import { Navigate, useNavigate } from 'react-router-dom';
@@ -40,12 +40,23 @@ const emptyRecipe: NewRecipe = {
   is_public: false,
 };
 
+const emptyGenerated: GeneratedRecipe = {
+  title: '',
+  description: '',
+  ingredients: [],
+  directions: [],
+};
+
 const CreateRecipe = () => {
   const user = useAppSelector((state) => state.auth.user);
   const token = useAppSelector((state) => state.auth.token);
   const [value, setValue] = useState('text');
   const [promptText, setPromptText] = useState('');
+  const [generatedPrompt, setGeneratedPrompt] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [partialRecipe, setPartialRecipe] = useState<GeneratedRecipe | null>(
+    null,
+  );
   const [selectedRecipe, setSelectedRecipe] = useState<NewRecipe | null>(
     emptyRecipe,
   );
@@ -91,9 +102,22 @@ const CreateRecipe = () => {
 
   const generateFromPrompt = async () => {
     setLoading(true);
-    const recipe = await generateService.fromPrompt(promptText);
-    setLoading(false);
-    setSelectedRecipe(recipe);
+    setPartialRecipe(emptyGenerated);
+    try {
+      // Generating the same prompt again asks for a fresh recipe, not the cached one
+      const recipe = await generateService.streamFromPrompt(
+        promptText,
+        promptText === generatedPrompt,
+        (delta) => setPartialRecipe((partial) => partial && applyDelta(partial, delta)),
+      );
+      setSelectedRecipe(recipe);
+      setGeneratedPrompt(promptText);
+    } catch (error) {
+      console.error('Failed to generate recipe from prompt:', error);
+    } finally {
+      setLoading(false);
+      setPartialRecipe(null);
+    }
   };
 
   const handleImageSelect = (event: React.ChangeEvent<HTMLInputElement>) => {
@@ -479,7 +503,7 @@ const CreateRecipe = () => {
       {loading && (
         <Box
           display="flex"
-          height="40vh"
+          minHeight="40vh"
           justifyContent="center"
           alignItems="center"
           flexDirection="column"
@@ -489,6 +513,26 @@ const CreateRecipe = () => {
           <Typography variant="body1" sx={{ color: '#666' }}>
             Generating your recipe...
           </Typography>
+          {partialRecipe?.title && (
+            <Box sx={{ width: { xs: '100%', md: '600px' }, px: { xs: 2, md: 0 } }}>
+              <Typography variant="h5" sx={{ fontWeight: 600, mb: 1 }}>
+                {partialRecipe.title}
+              </Typography>
+              <Typography variant="body1" sx={{ color: '#666', mb: 2 }}>
+                {partialRecipe.description}
+              </Typography>
+              <Box component="ul" sx={{ pl: 3, m: 0 }}>
+                {partialRecipe.ingredients.map((ingredient, i) => (
+                  <li key={i}>{ingredient}</li>
+                ))}
+              </Box>
+              <Box component="ol" sx={{ pl: 3 }}>
+                {partialRecipe.directions.map((direction, i) => (
+                  <li key={i}>{direction}</li>
+                ))}
+              </Box>
+            </Box>
+          )}
         </Box>
       )}
 
@@ -1,8 +1,15 @@
-import { useEffect } from "react";
-import { Container, Grid2 as Grid, Typography, Box, CircularProgress } from "@mui/material";
+import { useEffect, useState } from "react";
+import {
+  Container,
+  Grid2 as Grid,
+  Typography,
+  Box,
+  Button,
+  CircularProgress,
+} from "@mui/material";
 import { Navigate } from "react-router-dom";
 import { useAppDispatch, useAppSelector } from "../hooks";
-import { initializeMyRecipes } from "../reducers/recipeReducer";
+import { initializeMyRecipes, loadMoreMyRecipes } from "../reducers/recipeReducer";
 import RecipeCard from "./RecipeCard";
 
 const MyRecipes = () => {
@@ -10,13 +17,20 @@ const MyRecipes = () => {
   const recipes = useAppSelector((state) => state.recipes);
   const user = useAppSelector((state) => state.auth.user);
   const token = useAppSelector((state) => state.auth.token);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   useEffect(() => {
     if (user) {
-      dispatch(initializeMyRecipes());
+      dispatch(initializeMyRecipes()).then(setNextCursor);
     }
   }, [dispatch, user]);
 
+  const handleLoadMore = async () => {
+    if (nextCursor) {
+      setNextCursor(await dispatch(loadMoreMyRecipes(nextCursor)));
+    }
+  };
+
   // Wait for auth to load before deciding to redirect
   // If we have a token but no user yet, the user is still being loaded
   if (token && !user) {
@@ -56,6 +70,18 @@ const MyRecipes = () => {
           </Grid>
         ))}
       </Grid>
+
+      {nextCursor && (
+        <Box display="flex" justifyContent="center" sx={{ mt: 3 }}>
+          <Button
+            variant="outlined"
+            onClick={handleLoadMore}
+            sx={{ color: "#9c3848", borderColor: "#9c3848" }}
+          >
+            Load more
+          </Button>
+        </Box>
+      )}
     </Container>
   );
 };
@@ -1,17 +1,60 @@
-import { useEffect } from "react";
-import { Container, Grid2 as Grid, Typography, Box } from "@mui/material";
+import { FormEvent, useEffect, useState } from "react";
+import {
+  Container,
+  Grid2 as Grid,
+  Typography,
+  Box,
+  Button,
+  TextField,
+} from "@mui/material";
 import { useAppDispatch, useAppSelector } from "../hooks";
-import { initializePublicRecipes } from "../reducers/recipeReducer";
+import {
+  initializePublicRecipes,
+  loadMorePublicRecipes,
+} from "../reducers/recipeReducer";
 import RecipeCard from "./RecipeCard";
+import recipeService from "../services/recipes";
+import { Recipe } from "../types";
 
 const PublicRecipes = () => {
   const dispatch = useAppDispatch();
   const recipes = useAppSelector((state) => state.recipes);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [query, setQuery] = useState("");
+  // Results for the last submitted search; null while browsing everything
+  const [searchResults, setSearchResults] = useState<Recipe[] | null>(null);
+  const [searchCursor, setSearchCursor] = useState<string | null>(null);
 
   useEffect(() => {
-    dispatch(initializePublicRecipes());
+    dispatch(initializePublicRecipes()).then(setNextCursor);
   }, [dispatch]);
 
+  const handleSearch = async (event: FormEvent) => {
+    event.preventDefault();
+    const q = query.trim();
+    if (!q) {
+      setSearchResults(null);
+      return;
+    }
+    const page = await recipeService.search(q);
+    setSearchResults(page.items);
+    setSearchCursor(page.next_cursor);
+  };
+
+  const handleLoadMore = async () => {
+    if (searchResults) {
+      if (!searchCursor) return;
+      const page = await recipeService.search(query.trim(), searchCursor);
+      setSearchResults([...searchResults, ...page.items]);
+      setSearchCursor(page.next_cursor);
+    } else if (nextCursor) {
+      setNextCursor(await dispatch(loadMorePublicRecipes(nextCursor)));
+    }
+  };
+
+  const shown = searchResults ?? recipes;
+  const moreAvailable = searchResults ? searchCursor : nextCursor;
+
   return (
     <Container maxWidth="md" sx={{ py: 4 }}>
       <Box sx={{ mb: 4 }}>
@@ -26,17 +69,40 @@ const PublicRecipes = () => {
           Public Recipes
         </Typography>
         <Typography variant="body1" sx={{ color: "#666" }}>
-          {recipes.length} recipes shared by the community
+          {searchResults
+            ? `${searchResults.length} recipes matching "${query.trim()}"`
+            : `${recipes.length} recipes shared by the community`}
         </Typography>
+        <Box component="form" onSubmit={handleSearch} sx={{ mt: 2 }}>
+          <TextField
+            fullWidth
+            size="small"
+            placeholder="Search by title, description or ingredient"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+          />
+        </Box>
       </Box>
 
       <Grid container spacing={2}>
-        {recipes.map((recipe) => (
+        {shown.map((recipe) => (
           <Grid key={recipe.id} size={12}>
             <RecipeCard recipe={recipe} />
           </Grid>
         ))}
       </Grid>
+
+      {moreAvailable && (
+        <Box display="flex" justifyContent="center" sx={{ mt: 3 }}>
+          <Button
+            variant="outlined"
+            onClick={handleLoadMore}
+            sx={{ color: "#9c3848", borderColor: "#9c3848" }}
+          >
+            Load more
+          </Button>
+        </Box>
+      )}
     </Container>
   );
 };
@@ -8,6 +8,7 @@ import {
 import { Restaurant, Public } from "@mui/icons-material";
 import { Link } from "react-router-dom";
 import { Recipe } from "../types";
+import { imageSrcSet } from "../images";
 
 interface Props {
   recipe: Recipe;
@@ -46,6 +47,8 @@ const RecipeCard = ({ recipe, showPublicBadge = false }: Props) => {
           <Box
             component="img"
             src={recipe.image_url}
+            srcSet={imageSrcSet(recipe)}
+            sizes="100px"
             alt={recipe.title}
             sx={{
               width: 100,
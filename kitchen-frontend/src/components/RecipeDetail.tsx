@@ -28,6 +28,7 @@ import { NewRecipe, Recipe } from "../types";
 import PageNotFound from "./PageNotFound";
 import { modifyRecipe, appendRecipe } from "../reducers/recipeReducer";
 import recipeService from "../services/recipes";
+import { imageSrcSet } from "../images";
 
 const RecipeDetail = () => {
   const [isEditing, setIsEditing] = useState(false);
@@ -137,6 +138,8 @@ const RecipeDetail = () => {
               <Box
                 component="img"
                 src={recipe.image_url}
+                srcSet={imageSrcSet(recipe)}
+                sizes="(max-width: 900px) 100vw, 900px"
                 alt={recipe.title}
                 sx={{
                   mt: 3,
@@ -0,0 +1,16 @@
+import { Recipe } from "./types";
+
+// Builds a srcset from a recipe's variants of one format. The browser picks the
+// smallest width that fills the rendered size, falling back to image_url.
+export const imageSrcSet = (
+  recipe: Pick<Recipe, "image_variants">,
+  contentType = "image/webp",
+) => {
+  const variants = (recipe.image_variants ?? []).filter(
+    (v) => v.content_type === contentType,
+  );
+  if (variants.length === 0) {
+    return undefined;
+  }
+  return variants.map((v) => `${v.url} ${v.width}w`).join(", ");
+};
@@ -15,6 +15,9 @@ const recipeSlice = createSlice({
     appendRecipe(state, action) {
       state.push(action.payload);
     },
+    appendRecipes(state, action) {
+      state.push(...action.payload);
+    },
     updateRecipe(state, action) {
       return state.map((r) =>
         r.id === action.payload.id ? action.payload : r
@@ -23,7 +26,8 @@ const recipeSlice = createSlice({
   },
 });
 
-export const { setRecipes, appendRecipe, updateRecipe } = recipeSlice.actions;
+export const { setRecipes, appendRecipe, appendRecipes, updateRecipe } =
+  recipeSlice.actions;
 
 export const deleteRecipe = (id: string) => {
   return async (dispatch: AppDispatch, getState: () => { recipes: Recipe[] }) => {
@@ -33,13 +37,29 @@ export const deleteRecipe = (id: string) => {
   };
 };
 
+// Each loader returns the cursor for the next page, or null when there is none
 export const initializePublicRecipes = () => {
   return async (dispatch: AppDispatch) => {
     try {
-      const recipes = await recipesService.getPublic();
-      dispatch(setRecipes(recipes));
+      const page = await recipesService.getPublic();
+      dispatch(setRecipes(page.items));
+      return page.next_cursor;
+    } catch {
+      console.log("ERROR!!");
+      return null;
+    }
+  };
+};
+
+export const loadMorePublicRecipes = (cursor: string) => {
+  return async (dispatch: AppDispatch) => {
+    try {
+      const page = await recipesService.getPublic(cursor);
+      dispatch(appendRecipes(page.items));
+      return page.next_cursor;
     } catch {
       console.log("ERROR!!");
+      return cursor;
     }
   };
 };
@@ -47,10 +67,25 @@ export const initializePublicRecipes = () => {
 export const initializeMyRecipes = () => {
   return async (dispatch: AppDispatch) => {
     try {
-      const recipes = await recipesService.getMine();
-      dispatch(setRecipes(recipes));
+      const page = await recipesService.getMine();
+      dispatch(setRecipes(page.items));
+      return page.next_cursor;
+    } catch {
+      console.log("ERROR!!");
+      return null;
+    }
+  };
+};
+
+export const loadMoreMyRecipes = (cursor: string) => {
+  return async (dispatch: AppDispatch) => {
+    try {
+      const page = await recipesService.getMine(cursor);
+      dispatch(appendRecipes(page.items));
+      return page.next_cursor;
     } catch {
       console.log("ERROR!!");
+      return cursor;
     }
   };
 };
@@ -1,22 +1,94 @@
 import axios from "axios";
-import { NewRecipe } from "../types";
+import { GeneratedRecipe, GenerationJob, NewRecipe, RecipeDelta } from "../types";
 
 const baseUrl = "/api/generate";
 
-const fromPrompt = async (promptText: string) => {
+const fromPrompt = async (promptText: string, regenerate = false) => {
   const res = await axios.post<NewRecipe>(`${baseUrl}/from-prompt`, {
     promptText,
+    regenerate,
   });
   return res.data;
 };
 
+export const applyDelta = (
+  recipe: GeneratedRecipe,
+  { field, index, delta }: RecipeDelta,
+): GeneratedRecipe => {
+  if (field === "ingredients" || field === "directions") {
+    const items = [...recipe[field]];
+    const i = index ?? 0;
+    items[i] = (items[i] ?? "") + delta;
+    return { ...recipe, [field]: items };
+  }
+  return { ...recipe, [field]: recipe[field] + delta };
+};
+
+// Streams the recipe as Server-Sent Events. EventSource can't POST, so the
+// stream is read with fetch and split into events here.
+const streamFromPrompt = async (
+  promptText: string,
+  regenerate: boolean,
+  onDelta: (delta: RecipeDelta) => void,
+) => {
+  const res = await fetch(`${baseUrl}/from-prompt/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ promptText, regenerate }),
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`Generation failed with status ${res.status}`);
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? "null");
+      if (event === "delta") {
+        onDelta(data as RecipeDelta);
+      } else if (event === "recipe") {
+        return data as NewRecipe;
+      } else if (event === "error") {
+        throw new Error(data.detail);
+      }
+    }
+  }
+  throw new Error("Stream ended before the recipe was complete");
+};
+
+const JOB_POLL_MS = 1000;
+
+// Polls a generation job until it has a recipe or has failed
+const waitForJob = async (jobId: string) => {
+  for (;;) {
+    const res = await axios.get<GenerationJob>(`${baseUrl}/jobs/${jobId}`);
+    const job = res.data;
+    if (job.status === "succeeded" && job.recipe) return job.recipe;
+    if (job.status === "failed") {
+      throw new Error(job.error ?? "Generation failed");
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+  }
+};
+
+// Vision calls are slow, so queue a job rather than hold the request open
 const fromImage = async (imageFile: File) => {
   const formData = new FormData();
   formData.append("image", imageFile);
-  const res = await axios.post<NewRecipe>(`${baseUrl}/from-image`, formData, {
-    headers: { "Content-Type": "multipart/form-data" },
-  });
-  return res.data;
+  const res = await axios.post<GenerationJob>(
+    `${baseUrl}/jobs/from-image`,
+    formData,
+    { headers: { "Content-Type": "multipart/form-data" } },
+  );
+  return waitForJob(res.data.id);
 };
 
-export default { fromPrompt, fromImage };
+export default { fromPrompt, streamFromPrompt, fromImage };
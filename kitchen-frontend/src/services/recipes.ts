@@ -1,5 +1,5 @@
 import axios from "axios";
-import { NewRecipe, Recipe } from "../types";
+import { NewRecipe, Recipe, RecipePage } from "../types";
 const baseUrl = "/api/recipes";
 
 const getAuthConfig = () => {
@@ -7,12 +7,25 @@ const getAuthConfig = () => {
   return token ? { headers: { Authorization: `Bearer ${token}` } } : {};
 };
 
-const getPublic = () => {
-  return axios.get<Recipe[]>(baseUrl).then((res) => res.data);
+const getPublic = (cursor?: string) => {
+  return axios
+    .get<RecipePage>(baseUrl, { params: { cursor } })
+    .then((res) => res.data);
 };
 
-const getMine = async () => {
-  const response = await axios.get<Recipe[]>(`${baseUrl}/mine`, getAuthConfig());
+const getMine = async (cursor?: string) => {
+  const response = await axios.get<RecipePage>(`${baseUrl}/mine`, {
+    ...getAuthConfig(),
+    params: { cursor },
+  });
+  return response.data;
+};
+
+const search = async (q: string, cursor?: string) => {
+  const response = await axios.get<RecipePage>(`${baseUrl}/search`, {
+    ...getAuthConfig(),
+    params: { q, cursor },
+  });
   return response.data;
 };
 
@@ -53,4 +66,4 @@ const uploadImage = async (recipeId: string, imageFile: File) => {
   return response.data;
 };
 
-export default { getPublic, getMine, getById, create, update, remove, uploadImage };
+export default { getPublic, getMine, search, getById, create, update, remove, uploadImage };
@@ -4,6 +4,12 @@ export interface User {
   name: string;
 }
 
+export interface ImageVariant {
+  url: string;
+  width: number;
+  content_type: string;
+}
+
 export interface Recipe {
   id: string;
   title: string;
@@ -13,6 +19,34 @@ export interface Recipe {
   is_public: boolean;
   user_id: string;
   image_url?: string;
+  image_variants?: ImageVariant[];
+}
+
+export interface RecipePage {
+  items: Recipe[];
+  next_cursor: string | null;
 }
 
 export type NewRecipe = Omit<Recipe, "id" | "user_id">;
+
+export type GeneratedRecipe = Pick<
+  NewRecipe,
+  "title" | "description" | "ingredients" | "directions"
+>;
+
+export interface RecipeDelta {
+  field: keyof GeneratedRecipe;
+  index?: number;
+  delta: string;
+}
+
+export interface GenerationJob {
+  id: string;
+  kind: "prompt" | "image";
+  status: "queued" | "running" | "succeeded" | "failed";
+  attempts: number;
+  recipe: NewRecipe | null;
+  error: string | null;
+  created_at: string;
+  updated_at: string;
+}
@@ -10,6 +10,11 @@ export default defineConfig({
         target: "http://localhost:3000",
         changeOrigin: true,
       },
+      // Images saved by the backend's local storage backend
+      "/media": {
+        target: "http://localhost:3000",
+        changeOrigin: true,
+      },
     },
   },
 });